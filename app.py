@@ -2,7 +2,8 @@ import streamlit as st
 import yaml
 from yaml.loader import SafeLoader
 import time
-import streamlit_authenticator as stauth
+from utils.model_registry import get_registry
+from utils.user_store import get_authenticator, get_user_store
 
 # Function to load the YAML configuration file
 def load_app_config(config_path: str):
@@ -17,19 +18,13 @@ def load_app_config(config_path: str):
         st.error(f"Error loading YAML file: {e}")
         st.stop()
 
-# Function to initialize the Streamlit Authenticator
+# Function to initialize the Streamlit Authenticator (built once per process from the user store)
 def setup_authenticator(config):
-    authenticator = stauth.Authenticate(
-        config['credentials'],
-        config['cookie']['name'],
-        config['cookie']['key'],
-        config['cookie']['expiry_days'],
-        config['preauthorized']
-    )
-    return authenticator
+    authenticator, credentials = get_authenticator(config)
+    return authenticator, credentials
 
 # Function to display login and registration widgets
-def display_login_and_register(authenticator):
+def display_login_and_register(authenticator, credentials):
      # Set the path to your image
     image_path = "churn_image.png"  # Change this if your image is in a different location
     pg_image = f'''
@@ -55,11 +50,12 @@ def display_login_and_register(authenticator):
         st.info('Please login or register to proceed.')
         email, username, name = authenticator.register_user(location='sidebar', pre_authorization=False, fields={'Form name': 'Sign Up Here', 'Register': 'Sign Up'})
         if email:
+            # Save only the new user to the user store instead of rewriting config.yaml
+            if username in get_user_store().save_credentials(credentials):
+                st.error('Username already taken, please choose another one.')
+                return False
             st.success('User successfully registered.')
             time.sleep(3)
-            # Update the config with new credentials after registration
-            with open('./config.yaml', 'w', encoding='utf-8') as file:
-                yaml.dump(config, file, default_flow_style=False)
         return False
     else:
         st.error('Invalid username or password.')
@@ -187,10 +183,13 @@ st.set_page_config(page_title="Home", page_icon="🏠", layout="wide")
 config = load_app_config('./config.yaml')
 
 # Set up authenticator
-authenticator = setup_authenticator(config)
+authenticator, credentials = setup_authenticator(config)
 
 # Run the app with sidebar navigation
-if display_login_and_register(authenticator):
+if display_login_and_register(authenticator, credentials):
+    # Start loading the models in the background before the Predict page needs them
+    get_registry()
+
     # Add sidebar navigation
     st.sidebar.title("Navigation")
     # Welcome message
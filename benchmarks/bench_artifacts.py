@@ -0,0 +1,147 @@
+"""Load time and memory of the model artifact formats.
+
+Run from the repository root (Linux, memory is read from /proc):
+
+    python -m benchmarks.bench_artifacts --processes 4
+
+Starts --processes fresh interpreters per format, all loading the same
+model, and reports per format the median load time, the resident memory
+each process gained from loading and warming the model (anonymous memory is
+private to the process, file-backed pages are shared with other processes
+mapping the same file), and the total proportional set size (PSS) of the
+group while all of them are alive.
+PSS splits shared pages between the processes mapping them, so it shows how
+much memory the replicas really cost together.
+
+Formats:
+  joblib          the pickled sklearn pipeline (sklearn engine)
+  joblib-compile  the pickled pipeline compiled after loading (compiled engine before)
+  mmap            the compiled artifact folder, tree arrays memory-mapped
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from utils.model_registry import MANIFEST_PATH, MODELS_DIR, compiled_artifact_path, load_compiled
+
+LOADERS = {
+    'joblib': 'pipeline = joblib.load(MODEL_PATH)',
+    'joblib-compile': 'pipeline = CompiledPipeline(joblib.load(MODEL_PATH))',
+    'mmap': 'pipeline = CompiledPipeline.load(ARTIFACT_PATH)',
+}
+
+# Loads and warms the model, reports, then stays alive until the parent closes stdin
+CHILD = '''
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+import joblib
+import numpy as np
+from utils.model_registry import dummy_batch
+from utils.tree_compiler import CompiledPipeline, _numba_leaf_sum
+MODEL_PATH, ARTIFACT_PATH, SCHEMA = {model_path!r}, {artifact_path!r}, json.loads({schema!r})
+
+# Anonymous (private) and file-backed (shareable) resident memory in KiB
+def rss_kib():
+    with open('/proc/self/status') as file:
+        fields = dict(line.split(':', 1) for line in file)
+    return int(fields['RssAnon'].split()[0]), int(fields['RssFile'].split()[0])
+
+# Load the numba kernel for writable and read-only (mapped) arrays, so its code is not counted as model memory
+if _numba_leaf_sum is not None:
+    for writeable in (True, False):
+        arrays = [np.zeros((1, 1), np.int32), np.full((1, 1), np.inf), np.ones((1, 1), bool), np.zeros((1, 3))]
+        for array in arrays:
+            array.flags.writeable = writeable
+        _numba_leaf_sum(np.zeros((1, 1), np.float32), *arrays, 1, 1)
+
+# Import the classes the pickles refer to first, so only the load itself is measured
+import sklearn.compose, sklearn.ensemble, sklearn.impute, sklearn.pipeline, sklearn.preprocessing
+try:
+    import imblearn.pipeline
+except ImportError:
+    pass
+batch = dummy_batch(SCHEMA)
+before = rss_kib()
+start = time.perf_counter()
+{loader}
+load_seconds = time.perf_counter() - start
+pipeline.predict_proba(batch)
+after = rss_kib()
+print(json.dumps({{'load_seconds': load_seconds, 'anon_delta_kib': after[0] - before[0], 'file_delta_kib': after[1] - before[1]}}), flush=True)
+sys.stdin.read()
+'''
+
+
+# Proportional and private memory of a running process, in KiB
+def smaps_rollup(pid):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {'pss': fields.get('Pss', 0), 'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)}
+
+
+def run_group(script, processes):
+    children, reports = [], []
+    try:
+        # Started one after another so the load times do not compete for the CPU
+        for _ in range(processes):
+            child = subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            children.append(child)
+            line = child.stdout.readline()
+            if not line:
+                raise RuntimeError(f'Loader exited with code {child.wait()}')
+            reports.append(json.loads(line))
+        # Measured while every replica is alive, so shared pages are split between them
+        memory = [smaps_rollup(child.pid) for child in children]
+    finally:
+        for child in children:
+            child.stdin.close()
+            child.wait()
+    return {
+        'load_ms_median': statistics.median(report['load_seconds'] for report in reports) * 1000,
+        'anon_delta_mib_mean': statistics.mean(report['anon_delta_kib'] for report in reports) / 1024,
+        'file_delta_mib_mean': statistics.mean(report['file_delta_kib'] for report in reports) / 1024,
+        'private_mib_mean': statistics.mean(m['private'] for m in memory) / 1024,
+        'pss_mib_total': sum(m['pss'] for m in memory) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark load time and memory of the model artifact formats')
+    parser.add_argument('--processes', type=int, default=4, help='Replicas loading the model at the same time')
+    parser.add_argument('--model', default=None, help='Model name from the manifest (default: the first one)')
+    parser.add_argument('--formats', nargs='+', default=list(LOADERS), choices=list(LOADERS))
+    parser.add_argument('--output', default=None, help='Optional JSON file to write the results to')
+    args = parser.parse_args()
+
+    with open(MANIFEST_PATH, encoding='utf-8') as file:
+        manifest = json.load(file)['models']
+    name = args.model or next(iter(manifest))
+    entry = manifest[name]
+    model_path = os.path.join(MODELS_DIR, entry['file'])
+    # Make sure the artifact folder exists and matches the model file
+    load_compiled(model_path, entry['version'])
+
+    results = {'model': name, 'processes': args.processes, 'formats': {}}
+    print(f'{name}: {args.processes} processes per format')
+    print(f"{'format':<16}{'load ms':>10}{'anon +MiB':>11}{'file +MiB':>11}{'private MiB':>13}{'PSS total MiB':>15}")
+    for fmt in args.formats:
+        script = CHILD.format(model_path=model_path, artifact_path=compiled_artifact_path(model_path, entry['version']),
+                              schema=json.dumps(entry['feature_schema']), loader=LOADERS[fmt])
+        group = run_group(script, args.processes)
+        results['formats'][fmt] = group
+        print(f"{fmt:<16}{group['load_ms_median']:>10.1f}{group['anon_delta_mib_mean']:>11.2f}{group['file_delta_mib_mean']:>11.2f}"
+              f"{group['private_mib_mean']:>13.1f}{group['pss_mib_total']:>15.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
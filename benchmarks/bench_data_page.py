@@ -0,0 +1,98 @@
+"""Page query time and payload of the Data page as the dataset grows.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_data_page --rows 7000 1000000 10000000
+
+The churn dataset is replicated to each size (with unique customer IDs),
+indexed with utils.table_index, and a set of typical page queries is timed:
+first and last page, a sorted page deep into the table, value filters and a
+customerID search. Times are medians over --repeat runs once the sort
+permutations and the query's row order are built; the one-off cost of
+building them is reported as well. The payload is the Arrow-encoded page,
+which is what st.dataframe sends to the browser.
+"""
+import argparse
+import json
+import statistics
+import time
+import warnings
+import numpy as np
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+from utils.bitmap_index import BitmapIndex
+from utils.data_loader import DATASET_PATH, parse_dataset
+from utils.table_index import TableIndex
+
+warnings.filterwarnings('ignore')
+
+QUERIES = {
+    'first page': dict(),
+    'last page': dict(page=-1),
+    'sorted, deep page': dict(sort_by='TotalCharges', descending=True, page=-10),
+    'filtered, sorted': dict(filters={'Contract': ['Two year'], 'InternetService': ['Fiber optic']}, sort_by='tenure'),
+    'customerID search': dict(search='75'),
+}
+
+
+# The dataset replicated to n rows, customer IDs suffixed with their copy number
+def build_table(n_rows):
+    base = parse_dataset(DATASET_PATH)
+    positions = np.resize(np.arange(len(base)), n_rows)
+    table = base.iloc[positions].reset_index(drop=True)
+    copy_number = (np.arange(n_rows) // len(base)).astype(str)
+    table['customerID'] = table['customerID'].astype(str).to_numpy(dtype=object) + '-' + copy_number.astype(object)
+    return table
+
+
+def run_query(index, page_size, page=0, **kwargs):
+    if page < 0:
+        total = index.count(kwargs.get('filters'), kwargs.get('search', ''), kwargs.get('sort_by'))
+        page = max((total + page_size - 1) // page_size + page, 0)
+    return index.query(page=page, page_size=page_size, **kwargs)
+
+
+def bench_size(n_rows, page_size, repeat):
+    table = build_table(n_rows)
+    start = time.perf_counter()
+    index = TableIndex(table, BitmapIndex(table))
+    build_seconds = time.perf_counter() - start
+
+    results = {'rows': n_rows, 'build_seconds': build_seconds, 'queries': {}}
+    for name, query in QUERIES.items():
+        start = time.perf_counter()
+        page, total = run_query(index, page_size, **query)
+        first_ms = (time.perf_counter() - start) * 1000
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run_query(index, page_size, **query)
+            times.append((time.perf_counter() - start) * 1000)
+        results['queries'][name] = {'first_ms': first_ms, 'median_ms': statistics.median(times), 'matching_rows': total,
+                                    'page_rows': len(page), 'payload_bytes': len(convert_pandas_df_to_arrow_bytes(page))}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark server-side paging of the Data page')
+    parser.add_argument('--rows', type=int, nargs='+', default=[7_000, 100_000, 1_000_000])
+    parser.add_argument('--page-size', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--output', default=None, help='Optional JSON file to write the results to')
+    args = parser.parse_args()
+
+    results = []
+    for n_rows in args.rows:
+        size = bench_size(n_rows, args.page_size, args.repeat)
+        results.append(size)
+        print(f"{n_rows:,} rows (index built in {size['build_seconds']:.2f} s)")
+        for name, query in size['queries'].items():
+            print(f"  {name:<20}{query['median_ms']:>8.2f} ms  (first {query['first_ms']:>8.1f} ms)"
+                  f"{query['payload_bytes'] / 1024:>8.1f} KiB  {query['matching_rows']:>12,} matching")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
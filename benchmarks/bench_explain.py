@@ -0,0 +1,79 @@
+"""Throughput of tree-path explanations against plain scoring.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_explain --rows 200000 --top-k 3
+
+Scores the bundled datasets replicated to --rows with the model alone,
+then again with utils.explain contributions and top-k drivers, and reports
+rows per second for both and the relative cost of explaining. It also
+checks that bias + contributions reproduce the model's raw scores.
+"""
+import argparse
+import json
+import time
+import warnings
+import joblib
+import numpy as np
+from benchmarks.bench_scoring import build_corpus
+from utils.explain import TreeExplainer, top_drivers
+from utils.model_registry import ModelRegistry
+from utils.scoring import score_batch
+
+warnings.filterwarnings('ignore')
+
+ENCODER_PATH = './Models/label_encoder.joblib'
+
+
+def rows_per_second(fn, corpus, batch_size):
+    start = time.perf_counter()
+    for begin in range(0, len(corpus), batch_size):
+        fn(corpus.iloc[begin:begin + batch_size])
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tree-path explanations against plain scoring')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--model', default=None, help='Model name from the manifest (default: first available)')
+    parser.add_argument('--output', default=None, help='Optional JSON file to write the results to')
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    name = args.model or registry.available()[0]
+    pipeline = registry.get(name)
+    encoder = joblib.load(ENCODER_PATH)
+    explainer = TreeExplainer(pipeline)
+    corpus = build_corpus(args.rows)
+
+    # Contributions must add up to the raw score of every row
+    sample = corpus.iloc[:args.batch_size]
+    X = explainer.pipeline.transform(sample)
+    additivity_error = float(np.abs(explainer.bias + explainer.feature_contributions(X).sum(axis=1)
+                                    - explainer.model.raw_predict(X)[:, 0]).max())
+
+    scoring = rows_per_second(lambda batch: score_batch(pipeline, encoder, batch), corpus, args.batch_size)
+    explaining = rows_per_second(lambda batch: top_drivers(explainer.contributions(batch), explainer.columns, args.top_k),
+                                 corpus, args.batch_size)
+    scoring_and_explaining = 1 / (1 / scoring + 1 / explaining)
+
+    results = {
+        'model': name, 'rows': len(corpus), 'batch_size': args.batch_size, 'top_k': args.top_k,
+        'trees': explainer.model.n_trees, 'depth': explainer.model.depth, 'additivity_error': additivity_error,
+        'scoring_rows_per_second': scoring, 'explaining_rows_per_second': explaining,
+        'scoring_and_explaining_rows_per_second': scoring_and_explaining,
+    }
+    print(f'{name}: {explainer.model.n_trees} trees of depth {explainer.model.depth}, additivity error {additivity_error:.1e}')
+    print(f'scoring:                {scoring:,.0f} rows/s')
+    print(f'explaining (top {args.top_k}):    {explaining:,.0f} rows/s')
+    print(f'scoring and explaining: {scoring_and_explaining:,.0f} rows/s ({scoring / scoring_and_explaining:.2f}x the time of scoring alone)')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
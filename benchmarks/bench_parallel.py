@@ -0,0 +1,76 @@
+"""Throughput scaling of parallel bulk scoring with the number of worker processes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel --rows 1000000 --workers 1 2 4 8 16 32
+
+Each run scores the bundled datasets replicated to --rows through
+utils.parallel.iter_scored_chunks_parallel and reports rows per second and
+the speed-up over the in-process path.
+"""
+import argparse
+import json
+import os
+import time
+import warnings
+import joblib
+from benchmarks.bench_scoring import build_corpus
+from utils.bulk import iter_scored_chunks
+from utils.model_registry import MODELS_DIR, ModelRegistry
+from utils.parallel import iter_scored_chunks_parallel, model_spec
+from utils.preprocess import BulkPreprocessor
+
+warnings.filterwarnings('ignore')
+
+ENCODER_PATH = './Models/label_encoder.joblib'
+
+
+def iter_chunks(corpus, chunk_size):
+    for start in range(0, len(corpus), chunk_size):
+        # Workers convert chunks in place, so each gets its own copy as an upload would
+        yield corpus.iloc[start:start + chunk_size].copy()
+
+
+def run(scored_chunks):
+    start = time.perf_counter()
+    rows = sum(chunk_rows for chunk_rows, _, _ in scored_chunks)
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel bulk scoring')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--engine', default='sklearn', choices=['sklearn', 'compiled'])
+    parser.add_argument('--model', default=None, help='Model name from the manifest (default: first available)')
+    parser.add_argument('--output', default=None, help='Optional JSON file to write the results to')
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    name = args.model or registry.available()[0]
+    entry = registry.info(name)
+    spec = model_spec(os.path.join(MODELS_DIR, entry['file']), ENCODER_PATH, entry['feature_schema'], args.engine)
+    corpus = build_corpus(args.rows)
+
+    # In-process baseline
+    rows, seconds = run(iter_scored_chunks(iter_chunks(corpus, args.chunk_size), BulkPreprocessor(entry['feature_schema']),
+                                           registry.get(name, args.engine), joblib.load(ENCODER_PATH)))
+    baseline = rows / seconds
+    results = {'model': name, 'engine': args.engine, 'rows': rows, 'chunk_size': args.chunk_size,
+               'cpu_count': os.cpu_count(), 'in_process_rows_per_second': baseline, 'workers': {}}
+    print(f'in-process: {baseline:,.0f} rows/s')
+
+    for n_workers in args.workers:
+        # Includes pool start-up and model loading in every worker, as a real bulk job pays them
+        rows, seconds = run(iter_scored_chunks_parallel(iter_chunks(corpus, args.chunk_size), spec, n_workers=n_workers))
+        results['workers'][str(n_workers)] = {'seconds': seconds, 'rows_per_second': rows / seconds, 'speedup': rows / seconds / baseline}
+        print(f'{n_workers} workers: {rows / seconds:,.0f} rows/s ({rows / seconds / baseline:.2f}x)')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Scoring benchmarks over the bundled Telco datasets.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scoring --max-rows 1000000 --output benchmarks/results/latest.json
+
+For every model in Models/manifest.json and every inference engine it
+measures model load time, file parse time, preprocessing time, single-row
+latency, batch throughput at several batch sizes and peak memory, and
+writes the results as JSON so runs can be compared (see --compare).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import time
+import tracemalloc
+import warnings
+import pandas as pd
+from utils.model_registry import ENGINES, ModelRegistry, key_name
+from utils.scoring import prepare_frame, score_batch
+
+warnings.filterwarnings('ignore')
+
+DATASETS = ['Data/LP2_Telco-churn-second-2000.csv', 'Data/Telco-churn-last-2000.xlsx', 'Data/churn_data.csv']
+BATCH_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def read_dataset(path):
+    return pd.read_excel(path) if path.endswith(('.xls', '.xlsx')) else pd.read_csv(path)
+
+
+# Run fn `repeat` times and return the median wall time in seconds
+def time_call(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+# Peak traced Python allocation (MiB) while running fn once
+def peak_memory_mib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+# Run the preprocessing steps of a pipeline, skipping fit-only resamplers such as SMOTE
+def preprocess(pipeline, df):
+    if not hasattr(pipeline, 'steps'):
+        return pipeline.transform(df)
+    X = df
+    for _, step in pipeline.steps[:-1]:
+        if not hasattr(step, 'fit_resample'):
+            X = step.transform(X)
+    return X
+
+
+def bench_parsing(repeat):
+    results = {}
+    for path in DATASETS:
+        seconds = time_call(lambda: read_dataset(path), repeat)
+        rows = len(read_dataset(path))
+        results[path] = {'rows': rows, 'seconds': seconds, 'rows_per_second': rows / seconds}
+    return results
+
+
+# Concatenate the bundled datasets and replicate them up to max_rows
+def build_corpus(max_rows):
+    frames = [prepare_frame(read_dataset(path)) for path in DATASETS]
+    base = pd.concat(frames, ignore_index=True)
+    copies = -(-max_rows // len(base))
+    return pd.concat([base] * copies, ignore_index=True).iloc[:max_rows]
+
+
+def bench_model(registry, encoder, name, engine, corpus, batch_sizes, repeat):
+    registry.max_resident = 1
+    start = time.perf_counter()
+    pipeline = registry.get(name, engine)
+    load_seconds = time.perf_counter() - start
+
+    sample = corpus.iloc[:10_000]
+    preprocess_seconds = time_call(lambda: preprocess(pipeline, prepare_frame(sample)), repeat)
+
+    single_row = corpus.iloc[:1]
+    latencies = []
+    for _ in range(max(repeat * 20, 50)):
+        start = time.perf_counter()
+        score_batch(pipeline, encoder, single_row)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    throughput = {}
+    for size in batch_sizes:
+        if size > len(corpus):
+            continue
+        batch = corpus.iloc[:size]
+        seconds = time_call(lambda: score_batch(pipeline, encoder, batch), repeat)
+        throughput[str(size)] = {'seconds': seconds, 'rows_per_second': size / seconds}
+
+    largest = corpus.iloc[:max((size for size in batch_sizes if size <= len(corpus)), default=len(corpus))]
+    return {
+        'model': name,
+        'engine': engine,
+        'load_seconds': load_seconds,
+        'preprocess_seconds_per_10k_rows': preprocess_seconds,
+        'single_row_latency_ms': {
+            'p50': latencies[len(latencies) // 2] * 1000,
+            'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        },
+        'throughput': throughput,
+        'peak_traced_mib_largest_batch': peak_memory_mib(lambda: score_batch(pipeline, encoder, largest)),
+    }
+
+
+# Print the throughput change of every model/engine/batch size against an earlier run
+def compare(previous, current):
+    previous_models = {(m['model'], m['engine']): m for m in previous['models']}
+    for model in current['models']:
+        before = previous_models.get((model['model'], model['engine']))
+        if before is None:
+            continue
+        for size, stats in model['throughput'].items():
+            if size in before['throughput']:
+                change = stats['rows_per_second'] / before['throughput'][size]['rows_per_second'] - 1
+                print(f"{key_name(model['model'], model['engine'])} batch {size}: {change:+.1%} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark model loading, parsing and scoring')
+    parser.add_argument('--max-rows', type=int, default=1_000_000, help='Rows the bundled data is replicated up to')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=ENGINES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None, help='JSON file to write (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier results file to compare throughput against')
+    args = parser.parse_args()
+
+    import joblib
+    import sklearn
+    encoder = joblib.load('./Models/label_encoder.joblib')
+    registry = ModelRegistry()
+
+    results = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'scikit-learn': sklearn.__version__,
+        },
+        'max_rows': args.max_rows,
+        'parsing': bench_parsing(args.repeat),
+        'models': [],
+    }
+    corpus = build_corpus(args.max_rows)
+
+    for name in registry.available():
+        for engine in args.engines:
+            print(f'Benchmarking {key_name(name, engine)}...', flush=True)
+            results['models'].append(bench_model(registry, encoder, name, engine, corpus, args.batch_sizes, args.repeat))
+
+    results['peak_rss_mib'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    output = args.output or os.path.join('benchmarks', 'results', f"{results['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f'Results written to {output}')
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            compare(json.load(file), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Cold-start import profile of the app and its pages.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup --budget-ms 800
+
+Every page's top-level imports are replayed in a fresh interpreter under
+`python -X importtime`. The module-level imports are what a new server
+process pays before it can render the page. The report shows, per page,
+the import time over the bare `import streamlit` baseline and the
+heaviest packages. The command exits non-zero when a page is over budget.
+"""
+import argparse
+import ast
+import datetime
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PAGES = ['app.py'] + sorted(glob.glob(os.path.join('pages', '*.py')))
+BASELINE = 'import streamlit'
+
+
+# The import statements at module level of a page, as a script to replay
+def page_imports(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        tree = ast.parse(file.read(), filename=path)
+    nodes = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return '\n'.join(ast.unparse(node) for node in nodes)
+
+
+# Parse the -X importtime report into the top-level packages and their cumulative microseconds
+def parse_importtime(stderr):
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the import that triggered them
+        name = name[1:]
+        if not name.startswith(' '):
+            packages[name] = packages.get(name, 0) + int(cumulative)
+    return packages
+
+
+# Run a script in a fresh interpreter, returns (wall seconds, import microseconds per package)
+def profile_script(script):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return elapsed, parse_importtime(proc.stderr)
+
+
+# Median of `repeat` fresh runs, with the package timings of the median run
+def profile(script, repeat):
+    runs = sorted((profile_script(script) for _ in range(repeat)), key=lambda run: sum(run[1].values()))
+    wall = statistics.median(run[0] for run in runs)
+    packages = runs[len(runs) // 2][1]
+    return {'wall_ms': round(wall * 1000, 1), 'import_ms': round(sum(packages.values()) / 1000, 1), 'packages': packages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the cold-start imports of the app pages')
+    parser.add_argument('--pages', nargs='+', default=PAGES)
+    parser.add_argument('--budget-ms', type=float, default=800, help='Allowed import time per page over the streamlit baseline')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=8, help='Heaviest packages listed per page')
+    parser.add_argument('--output', default=None, help='JSON file to write (default: benchmarks/results/startup-<timestamp>.json)')
+    args = parser.parse_args()
+
+    baseline = profile(BASELINE, args.repeat)
+    results = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'budget_ms': args.budget_ms,
+        'baseline': {key: baseline[key] for key in ('wall_ms', 'import_ms')},
+        'pages': [],
+    }
+    print(f"Baseline ({BASELINE}): {baseline['import_ms']:.0f} ms imports, {baseline['wall_ms']:.0f} ms wall")
+
+    over_budget = []
+    for path in args.pages:
+        try:
+            run = profile(page_imports(path), args.repeat)
+        except RuntimeError as e:
+            results['pages'].append({'page': path, 'error': str(e)})
+            print(f'{path}: could not be imported ({e})')
+            continue
+        extra_ms = round(run['import_ms'] - baseline['import_ms'], 1)
+        # Packages the page adds on top of streamlit itself
+        heaviest = sorted(((name, us) for name, us in run['packages'].items() if name not in baseline['packages']), key=lambda item: -item[1])
+        page = {
+            'page': path,
+            'import_ms': run['import_ms'],
+            'wall_ms': run['wall_ms'],
+            'over_baseline_ms': extra_ms,
+            'heaviest': [{'package': name, 'ms': round(us / 1000, 1)} for name, us in heaviest[:args.top]],
+        }
+        results['pages'].append(page)
+        status = 'OK' if extra_ms <= args.budget_ms else 'OVER BUDGET'
+        if extra_ms > args.budget_ms:
+            over_budget.append(path)
+        print(f"{path}: +{extra_ms:.0f} ms over baseline ({run['wall_ms']:.0f} ms wall) {status}")
+        for item in page['heaviest']:
+            print(f"    {item['package']:<30} {item['ms']:>8.1f} ms")
+
+    output = args.output or os.path.join('benchmarks', 'results', f"startup-{results['timestamp'].replace(':', '')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f'Results written to {output}')
+
+    if over_budget:
+        sys.exit(f"{len(over_budget)} page(s) over the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,19 @@
 import streamlit as st
-import yaml
-from yaml.loader import SafeLoader
 import time
-import streamlit_authenticator as stauth
+from utils.user_store import get_auth_module, get_authenticator, get_user_store, load_config
 
 # Set page configuration
 st.set_page_config(page_title="Home", page_icon="🏠", layout="wide")
 
 # Load the configuration file
 try:
-    with open('./config.yaml', 'r', encoding='utf-8') as file:
-        config = yaml.load(file, Loader=SafeLoader)
+    config = load_config('./config.yaml')
 except FileNotFoundError:
     st.error("Configuration file 'config.yaml' not found.")
     st.stop()
 
-# Create authenticator instance
-authenticator = stauth.Authenticate(
-    config['credentials'],
-    config['cookie']['name'],
-    config['cookie']['key'],
-    config['cookie']['expiry_days'],
-    config['preauthorized']
-)
-
-# Handle login process
+# Handle login process, the authenticator is built here for the session's login form
+authenticator, credentials = get_authenticator(config)
 name, authentication_status, username = authenticator.login(location='sidebar')
 
 if authentication_status:
@@ -113,14 +102,14 @@ elif authentication_status is None:
         )
         
         if email_of_registered_user:
-            st.success('The new user has been successfully registered.')
-            time.sleep(3)
-
-        # Save updated credentials to config file
-        with open('./config.yaml', 'w', encoding='utf-8') as file:
-            yaml.dump(config, file, default_flow_style=False)
-
-    except stauth.RegisterError as e:
+            # Save only the new user to the user store instead of rewriting config.yaml
+            if username_of_registered_user in get_user_store().save_credentials(credentials):
+                st.error('Username already taken, please choose another one.')
+            else:
+                st.success('The new user has been successfully registered.')
+                time.sleep(3)
+
+    except get_auth_module().RegisterError as e:
         st.error(f"Error registering user: {e}")
 
 # Incorrect login credentials
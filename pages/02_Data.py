@@ -2,6 +2,13 @@ import streamlit as st
 import pandas as pd
 from streamlit_modal import Modal
 import os
+from utils.bitmap_index import FILTER_COLUMNS
+from utils.data_loader import load_dataset
+from utils.figure_cache import normalize_filters
+from utils.table_index import load_table_index
+
+# Page sizes offered in the data table
+PAGE_SIZES = [25, 50, 100, 250]
 
 # Set page configuration
 st.set_page_config(page_title="Data", page_icon='🗄️', layout="wide")
@@ -48,14 +55,50 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
             # Dropdown menu to filter columns by type
             data_type = st.selectbox('Select Data Type:', ['All', 'Numeric Columns', 'Categorical Columns'])
 
-            # Filter the data based on the selected data type
+            # Filter the columns based on the selected data type (column names only, the rows are not copied)
+            columns = list(data.columns)
             if data_type == 'Numeric Columns':
-                data = data.select_dtypes(include=['number'])
+                columns = [col for col in columns if pd.api.types.is_numeric_dtype(data[col].dtype) and not pd.api.types.is_bool_dtype(data[col].dtype)]
             elif data_type == 'Categorical Columns':
-                data = data.select_dtypes(include=['object', 'category'])
-
-            # Display the filtered data
-            st.write(data)
+                columns = [col for col in columns if data[col].dtype == object or isinstance(data[col].dtype, pd.CategoricalDtype)]
+
+            # The rows are queried on the server and only the current page is sent to the browser
+            table_index = load_table_index(dataset_path)
+
+            search_col, sort_col, order_col, size_col = st.columns([2, 2, 1, 1])
+            with search_col:
+                search = st.text_input('Search customerID', placeholder='Starts with...', key='data_search')
+            with sort_col:
+                sort_by = st.selectbox('Sort by', [None] + list(data.columns), format_func=lambda col: 'Row order' if col is None else col, key='data_sort_by')
+            with order_col:
+                descending = st.radio('Order', ['Ascending', 'Descending'], key='data_sort_order', disabled=sort_by is None) == 'Descending'
+            with size_col:
+                page_size = st.selectbox('Rows per page', PAGE_SIZES, index=1, key='data_page_size')
+
+            # Value filters, resolved through the bitmap index shared with the dashboard
+            filters = {}
+            with st.expander('Filter values'):
+                filter_cols = st.columns(3)
+                for i, col in enumerate(FILTER_COLUMNS):
+                    with filter_cols[i % 3]:
+                        filters[col] = st.multiselect(col, table_index.bitmap_index.values(col), key=f'data_filter_{col}')
+
+            # Back to the first page whenever the query changes, and never past the last one
+            total = table_index.count(filters, search, sort_by)
+            n_pages = max((total + page_size - 1) // page_size, 1)
+            query_key = (normalize_filters(filters), search, sort_by, descending, page_size)
+            if st.session_state.get('data_query') != query_key:
+                st.session_state['data_query'] = query_key
+                st.session_state['data_page'] = 1
+            st.session_state['data_page'] = min(st.session_state.get('data_page', 1), n_pages)
+            page = st.number_input(f'Page (of {n_pages:,})', min_value=1, max_value=n_pages, step=1, key='data_page')
+
+            page_data, total = table_index.query(filters, search, sort_by, descending, page=page - 1, page_size=page_size, columns=columns)
+            first_row = (page - 1) * page_size + 1 if total else 0
+            st.caption(f"Rows {first_row:,}-{first_row + len(page_data) - 1 if total else 0:,} of {total:,} matching customers ({table_index.n_rows:,} in total)")
+
+            # Display the current page of the filtered data
+            st.dataframe(page_data)
 
     # Define the path to the dataset
     dataset_path = 'Data/churn_data.csv'
@@ -65,9 +108,8 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
         st.error(f"The file '{dataset_path}' does not exist. Please check the path.")
     else:
         try:
-            # Load the dataset
-            data = pd.read_csv(dataset_path)
-            data = data.drop('Unnamed: 0', axis=1)  # Remove unwanted column if needed
+            # Load the dataset (parsed once and shared by all sessions)
+            data = load_dataset(dataset_path)
             
             # Call the function to filter and display columns
             filter_columns(data)
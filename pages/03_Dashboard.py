@@ -1,11 +1,12 @@
 import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import os
+from utils import metrics
+from utils.data_loader import dataset_version, load_dataset
+from utils.figure_cache import figure_key, get_figure_cache
+from utils.plotting import scatter_figure, histogram_figure
+from utils.bitmap_index import FILTER_COLUMNS, load_bitmap_index
+from utils.cube import FILTER_DIMENSIONS, build_cube, load_cube, slice_cube, cube_kpis, tenure_trend
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -61,28 +62,51 @@ def dashboard_page():
         This dashboard provides insights into customer churn data, helping you understand the factors influencing churn and make data-driven decisions to improve customer retention.
         """)
 
-        # 2. Load your dataset
-        data = pd.read_csv('Data/churn_data.csv')
-
-        # Drop unnecessary column
-        data.drop('customerID', axis=1, inplace=True)
+        # 2. Load your dataset (shared and read-only, so it is never modified in place)
+        data = load_dataset('Data/churn_data.csv')
 
         # 3. Filters
         st.sidebar.subheader("Dashboard Filters")
 
+        # Per-value bitmaps of the filter columns, built once per dataset version
+        bitmap_index = load_bitmap_index('Data/churn_data.csv')
+
         # Create for Gender
-        gender = st.sidebar.multiselect("Pick your Gender", data["gender"].unique())
-        filtered_data = data.copy() if not gender else data[data["gender"].isin(gender)]
+        gender = st.sidebar.multiselect("Pick your Gender", bitmap_index.values("gender"))
 
         # Create for payment type
-        paymentmethod = st.sidebar.multiselect("Pick your Payment Method", data["PaymentMethod"].unique())
-        if paymentmethod:
-            filtered_data = filtered_data[filtered_data["PaymentMethod"].isin(paymentmethod)]
+        paymentmethod = st.sidebar.multiselect("Pick your Payment Method", bitmap_index.values("PaymentMethod"))
 
         # Create for Contract type
-        contract = st.sidebar.multiselect("Pick your Contract", data["Contract"].unique())
-        if contract:
-            filtered_data = filtered_data[filtered_data["Contract"].isin(contract)]
+        contract = st.sidebar.multiselect("Pick your Contract", bitmap_index.values("Contract"))
+
+        filters = {'gender': gender, 'PaymentMethod': paymentmethod, 'Contract': contract}
+
+        # Filters for the remaining indexed columns (services, partner, billing...)
+        with st.sidebar.expander("More filters"):
+            for col in FILTER_COLUMNS:
+                if col not in filters:
+                    filters[col] = st.multiselect(col, bitmap_index.values(col), key=f'dashboard_filter_{col}')
+
+        # Rows matching every filter, resolved with bitwise ANDs; no copy when nothing is filtered
+        filtered_data = bitmap_index.filter(data, filters)
+
+        # Pre-aggregated cube cells for the selected filters, used for KPIs and trend lines.
+        # The cube only covers the main filters, other filters aggregate the selected rows instead.
+        if any(values for col, values in filters.items() if col not in FILTER_DIMENSIONS):
+            cube_cells = build_cube(filtered_data)
+        else:
+            cube_cells = slice_cube(load_cube('Data/churn_data.csv'), filters)
+
+        # Figures already built for this dataset version and filter selection are shared across sessions
+        figure_cache = get_figure_cache()
+        dataset_hash = dataset_version('Data/churn_data.csv')
+
+        def cached_figure(chart_id, build):
+            def timed_build():
+                with metrics.timed('chart_build', chart=chart_id):
+                    return build()
+            return figure_cache.get_or_build(figure_key(dataset_hash, filters, chart_id), timed_build)
 
         # 4. Define EDA Function
         def eda_dash():
@@ -106,65 +130,56 @@ def dashboard_page():
             # Add an animated text
             st.write('<div class="zoom-in-animation"><h3>Delve into Exploratory Data Analysis Insights</h3></div>', unsafe_allow_html=True)
 
-            # 4.1 Scatter Plot with conditional coloring
-            scatter_plot = px.scatter(
-                filtered_data,
-                x='tenure',
-                y='MonthlyCharges',
-                color='Churn',
-                color_discrete_map={'yes': 'red', 'no': 'skyblue'},
-                title='Scatter Plot for Tenure vs Monthly Charges'
-            )
-            scatter_plot.update_traces(marker=dict(size=10, opacity=0.8, line=dict(width=2, color='DarkSlateGrey')))
-            st.plotly_chart(scatter_plot)
-
-            # 4.2 Histograms
+            # 4.1 Scatter Plot with conditional coloring (WebGL and downsampled for large selections)
+            st.plotly_chart(cached_figure('tenure_scatter', lambda: scatter_figure(
+                filtered_data, x='tenure', y='MonthlyCharges', color='Churn', title='Scatter Plot for Tenure vs Monthly Charges')))
+
+            # 4.2 Histograms (binned on the server)
             col1, col2 = st.columns(2)
             with col1:
-                fig = px.histogram(filtered_data, x="tenure", color="Churn", marginal="box", nbins=50, title="Histogram for Tenure")
-                st.plotly_chart(fig)
+                st.plotly_chart(cached_figure('tenure_histogram', lambda: histogram_figure(
+                    filtered_data, x="tenure", color="Churn", nbins=50, title="Histogram for Tenure")))
             with col2:
-                fig = px.histogram(filtered_data, x="MonthlyCharges", color="Churn", marginal="box", nbins=50, title="Histogram for Monthly Charges")
-                st.plotly_chart(fig)
+                st.plotly_chart(cached_figure('monthly_charges_histogram', lambda: histogram_figure(
+                    filtered_data, x="MonthlyCharges", color="Churn", nbins=50, title="Histogram for Monthly Charges")))
 
             # 4.3 Correlation Matrix and Heatmap for Numeric Variables
-            numeric_columns = filtered_data.select_dtypes(include=['number']).columns
-            numeric_df = filtered_data[numeric_columns]
-            numeric_correlation_matrix = numeric_df.corr()
-
-            fig = px.imshow(
-                numeric_correlation_matrix.values,
-                x=numeric_correlation_matrix.columns,
-                y=numeric_correlation_matrix.columns,
-                labels=dict(color="Correlation"),
-                color_continuous_scale='RdBu',
-                zmin=-1, zmax=1
-            )
-
-            fig.update_layout(title='Correlation Matrix Heatmap', xaxis_title="Numeric Variables", yaxis_title="Numeric Variables", width=800, height=600)
-
-            annotations = []
-            for i, row in enumerate(numeric_correlation_matrix.values):
-                for j, value in enumerate(row):
-                    annotations.append(dict(x=numeric_correlation_matrix.columns[j], y=numeric_correlation_matrix.index[i],
-                                            text=f"{value:.2f}", showarrow=False, font=dict(color='black')))
-            fig.update_layout(annotations=annotations)
-            st.plotly_chart(fig)
-
-            # 4.4 Trend of average monthly charges by tenure
-            avg_monthly_charges = filtered_data.groupby('tenure')['MonthlyCharges'].mean().reset_index()
-            fig = px.line(avg_monthly_charges, x='tenure', y='MonthlyCharges', title='Average Monthly Charges Trend by Tenure')
-            fig.update_layout(xaxis_title='Tenure', yaxis_title='Average Monthly Charges', width=800, height=500)
-            st.plotly_chart(fig)
-
-            # Calculate churn rate by tenure
-            churn_counts = filtered_data.groupby('tenure')['Churn'].value_counts().unstack(fill_value=0)
-            churn_counts['Churn Rate'] = churn_counts['Yes'] / churn_counts.sum(axis=1) * 100
-            churn_counts = churn_counts.reset_index()
-
-            fig = px.line(churn_counts, x='tenure', y='Churn Rate', title='Churn Rate by Tenure')
-            fig.update_layout(xaxis_title='Tenure', yaxis_title='Churn Rate (%)', width=800, height=500)
-            st.plotly_chart(fig)
+            def correlation_heatmap():
+                numeric_columns = filtered_data.select_dtypes(include=['number']).columns
+                numeric_df = filtered_data[numeric_columns]
+                numeric_correlation_matrix = numeric_df.corr()
+
+                # Cell labels are rendered from the matrix values by plotly instead of one annotation per cell
+                fig = px.imshow(
+                    numeric_correlation_matrix.values,
+                    x=numeric_correlation_matrix.columns,
+                    y=numeric_correlation_matrix.columns,
+                    labels=dict(color="Correlation"),
+                    color_continuous_scale='RdBu',
+                    zmin=-1, zmax=1,
+                    text_auto='.2f'
+                )
+                fig.update_traces(textfont=dict(color='black'))
+                fig.update_layout(title='Correlation Matrix Heatmap', xaxis_title="Numeric Variables", yaxis_title="Numeric Variables", width=800, height=600)
+                return fig
+
+            st.plotly_chart(cached_figure('correlation_heatmap', correlation_heatmap))
+
+            # 4.4 Trend of average monthly charges by tenure (summed from the cube)
+            def monthly_charges_trend():
+                fig = px.line(tenure_trend(cube_cells), x='tenure', y='MonthlyCharges', title='Average Monthly Charges Trend by Tenure')
+                fig.update_layout(xaxis_title='Tenure', yaxis_title='Average Monthly Charges', width=800, height=500)
+                return fig
+
+            st.plotly_chart(cached_figure('monthly_charges_trend', monthly_charges_trend))
+
+            # Churn rate by tenure
+            def churn_rate_trend():
+                fig = px.line(tenure_trend(cube_cells), x='tenure', y='Churn Rate', title='Churn Rate by Tenure')
+                fig.update_layout(xaxis_title='Tenure', yaxis_title='Churn Rate (%)', width=800, height=500)
+                return fig
+
+            st.plotly_chart(cached_figure('churn_rate_trend', churn_rate_trend))
 
         #Define the KPI function
         def kpi_dash():
@@ -185,13 +200,14 @@ def dashboard_page():
     
             st.write('<div class="zoom-in-animation"><h2 style="color:#1f77b4;">📊 Key Performance Indicators Insights</h2></div>', unsafe_allow_html=True)
 
-            # Sample filtered data for illustration
-            total_customers = len(filtered_data)
-            churned_customers = (filtered_data['Churn'] == 'Yes').sum()
-            churn_rate = (churned_customers / total_customers) * 100
-            avg_monthly_charge = filtered_data['MonthlyCharges'].mean()
-            avg_total_charge = filtered_data['TotalCharges'].mean()
-            avg_tenure = filtered_data['tenure'].mean()
+            # KPIs summed from the cube cells instead of scanning the filtered rows
+            kpis = cube_kpis(cube_cells)
+            total_customers = kpis['total_customers']
+            churned_customers = kpis['churned_customers']
+            churn_rate = kpis['churn_rate']
+            avg_monthly_charge = kpis['avg_monthly_charge']
+            avg_total_charge = kpis['avg_total_charge']
+            avg_tenure = kpis['avg_tenure']
 
             # Custom card styling for KPIs
             st.write("""
@@ -242,20 +258,24 @@ def dashboard_page():
 
             # Display a gauge for the churn rate
             st.subheader("Churn Rate Gauge")
-            fig = go.Figure(go.Indicator(
-                mode="gauge+number",
-                value=churn_rate,
-                title={'text': "Churn Rate (%)"},
-                gauge={'axis': {'range': [0, 100]},
-                    'bar': {'color': "#1f77b4"},
-                    'steps': [
-                        {'range': [0, 25], 'color': "#d4edda"},
-                        {'range': [25, 50], 'color': "#ffeeba"},
-                        {'range': [50, 75], 'color': "#f8d7da"},
-                        {'range': [75, 100], 'color': "#f5c6cb"}],
-                    'threshold': {'line': {'color': "red", 'width': 4}, 'thickness': 0.75, 'value': churn_rate}}))
-
-            fig.update_layout(height=400, margin={'t': 50, 'b': 0, 'l': 0, 'r': 0})
+            def churn_gauge():
+                fig = go.Figure(go.Indicator(
+                    mode="gauge+number",
+                    value=churn_rate,
+                    title={'text': "Churn Rate (%)"},
+                    gauge={'axis': {'range': [0, 100]},
+                        'bar': {'color': "#1f77b4"},
+                        'steps': [
+                            {'range': [0, 25], 'color': "#d4edda"},
+                            {'range': [25, 50], 'color': "#ffeeba"},
+                            {'range': [50, 75], 'color': "#f8d7da"},
+                            {'range': [75, 100], 'color': "#f5c6cb"}],
+                        'threshold': {'line': {'color': "red", 'width': 4}, 'thickness': 0.75, 'value': churn_rate}}))
+
+                fig.update_layout(height=400, margin={'t': 50, 'b': 0, 'l': 0, 'r': 0})
+                return fig
+
+            fig = cached_figure('churn_gauge', churn_gauge)
             st.plotly_chart(fig)
 
         # Define Menu
@@ -3,8 +3,14 @@ import pandas as pd
 import joblib
 import os
 import datetime
-import pickle as pl
-from sklearn.preprocessing import LabelEncoder
+from functools import partial
+from utils import metrics
+from utils.prediction_cache import get_prediction_cache, score_with_cache
+from utils.model_registry import get_registry
+from utils.history_writer import get_history_writer
+from utils.drift import get_drift_monitor
+from utils.bulk import CHUNK_SIZE
+from utils.jobs import ACTIVE_STATES, JOB_POLL_SECONDS, get_job_queue, job_preview, list_jobs, read_bytes
 
 # Set page configuration
 st.set_page_config(page_title="Predict", page_icon="🔮", layout="wide")
@@ -13,14 +19,6 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
     st.title("Predict Customer Churn!")
 
     # Load models and encoder
-    @st.cache_resource(show_spinner='Loading Gradient Boosting Model...')
-    def load_gradient_boosting_pipeline():
-        return joblib.load('./Models/best_gbc_tuned.joblib')
-
-    @st.cache_resource(show_spinner='Loading Random Forest Model...')
-    def load_random_forest_pipeline():
-        return joblib.load('./Models/best_rf_model.joblib')
-         
     @st.cache_resource(show_spinner='Loading Encoder...')
     def load_and_fit_encoder(encoder_path='./Models/label_encoder.joblib', labels=['No', 'Yes']):
         try:
@@ -35,6 +33,7 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
             return encoder
         except FileNotFoundError:
          # If the encoder file doesn't exist, create a new LabelEncoder and fit it
+            from sklearn.preprocessing import LabelEncoder
             encoder = LabelEncoder()
             encoder.fit(labels)
             # Save the newly created and fitted encoder
@@ -52,15 +51,15 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
 
     #     else:
     #         pipeline, threshold = load_random_forest_pipeline()  # Get both model and threshold
-    def select_model(key):
+    def select_model(key, engine='sklearn'):
+        # Models are discovered from Models/manifest.json and loaded lazily by the shared registry
+        registry = get_registry()
         col1, col2 = st.columns(2)
         with col1:
-            selected_model = st.selectbox('Select a model', ['Gradient Boosting', 'Random Forest'], key=key)
+            selected_model = st.selectbox('Select a model', registry.available(), key=key)
 
-        if selected_model == 'Gradient Boosting':
-            pipeline = load_gradient_boosting_pipeline()
-        else:
-            pipeline = load_random_forest_pipeline()  # Get both model 
+        with st.spinner(f'Loading {selected_model} Model...'):
+            pipeline = registry.get(selected_model, engine)
         # Debug: Print the type of pipeline
         st.write(f"Selected model: {selected_model}, Type of pipeline: {type(pipeline)}")
 
@@ -105,23 +104,18 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
         # Debug: Print pipeline to verify it's the correct model
         st.write(f"Pipeline: {pipeline}")
 
-        # Define Probability and Prediction
-        pred = pipeline.predict(df)
-        pred_int = int(pred[0])
-
         # Check if the encoder is fitted
         if not hasattr(encoder, 'classes_'):
             st.error("The LabelEncoder instance is not fitted. Please fit the encoder with the appropriate classes before using.")
             return
-        
-        # Define Probability and Prediction
-        pred_proba = pipeline.predict_proba(df)[0]
-
-       
-        prediction = encoder.inverse_transform([pred_int])[0]
 
-        # Calculate the probability of churn
-        probability = pipeline.predict_proba(df)[0][pred_int] * 100
+        # Define Probability and Prediction from a single model pass, reusing earlier identical submissions
+        model_version = get_registry().info(st.session_state['selected_model'])['version']
+        with metrics.timed('make_prediction', model=st.session_state['selected_model']):
+            labels, probabilities = score_with_cache(pipeline, encoder, df, get_prediction_cache(), model_version)
+        metrics.count('predictions', model=st.session_state['selected_model'])
+        prediction = labels[0]
+        probability = probabilities[0]
         st.session_state['prediction'] = prediction
         st.session_state['probability'] = probability
 
@@ -131,8 +125,10 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
         df['time_of_prediction'] = datetime.date.today()
         df['model_used'] = st.session_state['selected_model']
 
-        # Save the results to a CSV file
-        df.to_csv("Data/history.csv", mode='a', header=not os.path.exists("Data/history.csv"))
+        # Queue the record for the background writer, which commits the history in batches.
+        # The drift monitor folds each committed batch into its feature summaries.
+        get_drift_monitor()
+        get_history_writer().submit(df)
 
         return prediction, probability
 
@@ -180,6 +176,11 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
 
     tab1, tab2 = st.tabs(['Predict', 'Bulk Predict'])
 
+    # Hit rate of the prediction cache shared by all sessions
+    cache_stats = get_prediction_cache().stats()
+    st.sidebar.caption(f"Prediction cache: {cache_stats['entries']:,} entries, {cache_stats['hit_rate']:.0%} hit rate "
+                       f"({cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses)")
+
     with tab1:
         display_form()
 
@@ -196,36 +197,93 @@ if 'authentication_status' in st.session_state and st.session_state['authenticat
                 st.markdown(f'### Customer will stay 😊.')
                 st.markdown(f'## Probability: {final_probability:.2f}%')
 
-    with tab2:
-        pipeline_bulk, encoder_bulk = select_model(key='selected_model_bulk')
+    # Progress, cancel/resume and downloads of the bulk jobs of the logged-in user.
+    # While a job is queued or running the list refreshes itself every few seconds.
+    def display_jobs():
+        job_queue = get_job_queue()
+        jobs = list_jobs(owner=st.session_state.get('username'))
+        if not jobs:
+            st.write('Scoring jobs will show here!')
+            return
 
-        # File uploader for bulk predictions
-        uploaded_file = st.file_uploader("Choose a CSV or Excel File", type=['csv', 'xls', 'xlsx'])
-        if uploaded_file is not None:
-            file_extension = uploaded_file.name.split('.')[-1]
+        polling = any(job['state'] in ACTIVE_STATES for job in jobs)
+
+        @st.fragment(run_every=JOB_POLL_SECONDS if polling else None)
+        def job_list():
+            current = list_jobs(owner=st.session_state.get('username'))
+            # Switch polling off, and show the downloads, once every job has stopped
+            if polling and not any(job['state'] in ACTIVE_STATES for job in current):
+                st.rerun()
+
+            for job in current:
+                base_name = job['name'].rsplit('.', 1)[0]
+                with st.container(border=True):
+                    st.markdown(f"**{job['name']}** · {job['model']} · {job['state']}")
+                    total_rows = job['total_rows'] or 0
+                    fraction = min(job['rows_done'] / total_rows, 1.0) if total_rows else (1.0 if job['state'] == 'finished' else 0.0)
+                    st.progress(fraction, text=f"Scored {job['rows_done']:,} of {total_rows:,} customers")
+                    if job['error']:
+                        st.error(f"Could not score '{job['name']}': {job['error']}")
+
+                    cols = st.columns(4)
+                    if job['state'] in ACTIVE_STATES:
+                        cols[0].button('Cancel', key=f"cancel_{job['id']}", on_click=job_queue.cancel, args=(job['id'],),
+                                       disabled=job['cancel_requested'])
+                    else:
+                        if job['state'] in ('cancelled', 'failed'):
+                            cols[0].button('Resume', key=f"resume_{job['id']}", on_click=job_queue.resume, args=(job['id'],))
+                        cols[3].button('Delete', key=f"delete_{job['id']}", on_click=job_queue.delete, args=(job['id'],))
+
+                    if job['state'] == 'finished':
+                        # Files are only read when a download is clicked, not on every refresh
+                        if job['result_path']:
+                            cols[1].download_button('Download all predictions', partial(read_bytes, job['result_path']),
+                                                    file_name=f"predictions_{base_name}.csv", mime='text/csv', key=f"download_{job['id']}")
+                        # Rows with values the model cannot use are left out and reported instead
+                        if job['errors_path']:
+                            st.warning(f"{job['rejected']:,} of {job['rows_done']:,} rows were rejected because of invalid values.")
+                            cols[2].download_button('Download the error report', partial(read_bytes, job['errors_path']),
+                                                    file_name=f"errors_{base_name}.csv", mime='text/csv', key=f"errors_{job['id']}")
+                        with st.expander("The Dataframe with predicted churn"):
+                            preview = job_preview(job)
+                            st.caption(f"Showing the first {len(preview):,} of {job['scored']:,} scored customers.")
+                            st.write(preview)
+
+        job_list()
 
-            if file_extension == 'csv':
-                df = pd.read_csv(uploaded_file)
-            else:
-                df = pd.read_excel(uploaded_file)
-
-            st.write(df)
+    with tab2:
+        # The compiled engine evaluates all trees as flat arrays, faster on large files
+        use_compiled = st.checkbox('Use the compiled tree engine', key='compiled_engine_bulk')
+        bulk_engine = 'compiled' if use_compiled else 'sklearn'
+        select_model(key='selected_model_bulk', engine=bulk_engine)
 
-            # Preprocess the data
-            df.drop('CustomerID', axis=1, inplace=True)
-            df.columns = df.columns.str.lower()
-            df['Totalcharges'] = pd.to_numeric(df['Totalcharges'], errors='coerce')
+        # Large files can be split into chunks scored in parallel worker processes
+        col1, col2 = st.columns(2)
+        with col1:
+            max_workers = os.cpu_count() or 1
+            n_workers = st.slider('Worker processes', min_value=1, max_value=max_workers, value=1, key='bulk_workers') if max_workers > 1 else 1
+        with col2:
+            chunk_size = st.number_input('Rows per chunk', min_value=1_000, max_value=200_000, value=CHUNK_SIZE, step=1_000, key='bulk_chunk_size')
 
-            # Predict
-            pred = pipeline_bulk.predict(df)
-            prediction = encoder_bulk.inverse_transform(pred)
-            probability = pipeline_bulk.predict_proba(df) * 100
+        # Optionally add the input columns that drive each customer's churn score
+        col1, col2 = st.columns(2)
+        with col1:
+            explain = st.checkbox('Add the top churn drivers', key='bulk_explain')
+        with col2:
+            top_k = st.number_input('Drivers per customer', min_value=1, max_value=10, value=3, key='bulk_top_k', disabled=not explain)
+        top_k = int(top_k) if explain else 0
 
-            df['Churn'] = prediction
-            df['probability'] = probability.max(axis=1)
+        # File uploader for bulk predictions. Files are scored by a background job,
+        # so the page stays responsive and the results survive leaving it.
+        uploaded_file = st.file_uploader("Choose a CSV or Excel File", type=['csv', 'xls', 'xlsx'])
+        if uploaded_file is not None:
+            if st.button('Score this file', key='bulk_submit', type='primary'):
+                get_job_queue().submit(uploaded_file, st.session_state['selected_model_bulk'], bulk_engine, int(chunk_size), top_k,
+                                       n_workers, owner=st.session_state.get('username'))
+                st.success(f"Queued '{uploaded_file.name}' for scoring.")
 
-            st.subheader("The Dataframe with predicted churn")
-            st.write(df)
+        st.subheader("Scoring jobs")
+        display_jobs()
 
 else:
     st.warning('Please login to access this page')
@@ -1,6 +1,7 @@
 import streamlit as st
-import pandas as pd
-import os
+from utils.history_store import connect, distinct_values, query_history
+from utils.history_writer import get_history_writer
+from utils.drift import REFRESH_MIN_ROWS, get_drift_monitor
 
 st.set_page_config(
     page_title='Predict Customer Churn!',
@@ -9,21 +10,73 @@ st.set_page_config(
 )
 if 'authentication_status' in st.session_state and st.session_state['authentication_status']:
     def display_history_prediction():
+        # Commit predictions still waiting in the writer queue so they show up below
+        writer = get_history_writer()
+        writer.flush(timeout=2)
+        stats = writer.stats()
+        flush_ms = f"{stats['flush_p50_ms']:.1f} ms median flush" if stats['flush_p50_ms'] is not None else 'no flushes yet'
+        st.caption(f"History writer: {stats['queue_depth']:,} records queued, {stats['batches']:,} batches written, {flush_ms}")
 
-        csv_path = "Data/history.csv"
-        csv_exists = os.path.exists(csv_path)
+        conn = connect()
+        try:
+            # Filters backed by the indexes of the history store
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                models = st.multiselect('Model', distinct_values(conn, 'model_used'))
+            with col2:
+                predictions = st.multiselect('Prediction', distinct_values(conn, 'prediction'))
+            with col3:
+                date_range = st.date_input('Prediction date', value=())
+            with col4:
+                page_size = st.selectbox('Rows per page', [25, 50, 100, 250], index=1)
 
-        if csv_exists:
-            history = pd.read_csv(csv_path)
-            # Check if 'Unnamed: 0' exists and drop it
-            if 'Unnamed: 0' in history.columns:
-                history = history.drop('Unnamed: 0', axis =1)
-            st.dataframe(history)
+            date_from = date_range[0] if len(date_range) > 0 else None
+            date_to = date_range[1] if len(date_range) > 1 else date_from
+            filters = {'models': models, 'predictions': predictions, 'date_from': date_from, 'date_to': date_to}
+
+            # Keyset pagination: keep the cursor of every page visited so far
+            state_key = (tuple(models), tuple(predictions), str(date_from), str(date_to), page_size)
+            if st.session_state.get('history_filters') != state_key:
+                st.session_state['history_filters'] = state_key
+                st.session_state['history_cursors'] = [None]
+            cursors = st.session_state['history_cursors']
+
+            history = query_history(conn, page_size=page_size, before_id=cursors[-1], **filters)
+            st.dataframe(history.drop(columns='id'), use_container_width=True)
+
+            prev_col, page_col, next_col = st.columns([1, 2, 1])
+            with prev_col:
+                if st.button('⬅️ Previous', disabled=len(cursors) == 1):
+                    cursors.pop()
+                    st.rerun()
+            with page_col:
+                st.write(f'Page {len(cursors)}')
+            with next_col:
+                if st.button('Next ➡️', disabled=len(history) < page_size):
+                    cursors.append(int(history['id'].iloc[-1]))
+                    st.rerun()
+        finally:
+            conn.close()
+
+
+    # Input drift of the predictions against the training data, from incremental summaries
+    def display_drift():
+        monitor = get_drift_monitor()
+        # Picks up rows written by other processes since the last batch this one saw, once enough of them wait
+        monitor.refresh(min_rows=REFRESH_MIN_ROWS)
+        scores = monitor.scores()
+        st.subheader('Input drift')
+        st.caption('Population stability index (PSI) and binned KS distance of each feature against Data/churn_data.csv. '
+                   'PSI below 0.1 is stable, 0.1 to 0.25 a moderate shift, above 0.25 significant.')
+        st.dataframe(scores, use_container_width=True, hide_index=True,
+                     column_config={'psi': st.column_config.NumberColumn('PSI', format='%.3f'),
+                                    'ks': st.column_config.NumberColumn('KS', format='%.3f')})
 
 
     if __name__ == '__main__':
         st.title('History Page')
         display_history_prediction()
+        display_drift()
 
 else:
-    st.warning('Please login to access this page')
\ No newline at end of file
+    st.warning('Please login to access this page')
@@ -0,0 +1,175 @@
+"""Headless HTTP scoring service for the churn model.
+
+Run locally with:
+
+    python scoring_service.py --port 8000
+
+Endpoints:
+    POST /predict        one customer record as a JSON object
+    POST /predict/batch  {"records": [...]} or a JSON list of records
+    GET  /stats          request count and p50/p99 latency
+    GET  /health         liveness check
+
+Records are checked against the model's feature schema before they are
+queued; invalid records get a 400 listing the rejected fields. Concurrent
+requests are collected into micro-batches and each batch is scored with a
+single predict_proba call.
+"""
+import argparse
+import json
+import os
+import signal
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import joblib
+from utils.batcher import LatencyTracker, MicroBatcher
+from utils.preprocess import BulkPreprocessor
+from utils.scoring import records_to_frame, score_batch
+
+warnings.filterwarnings('ignore')
+
+
+# Feature schema of a model file from the manifest next to it, or described from the pipeline itself
+def load_feature_schema(model_path, pipeline):
+    manifest_path = os.path.join(os.path.dirname(model_path), 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as file:
+            for entry in json.load(file)['models'].values():
+                if entry['file'] == os.path.basename(model_path):
+                    return entry['feature_schema']
+    from utils.model_registry import describe_pipeline
+    return describe_pipeline(pipeline)
+
+
+# Load the model and encoder once. Returns a function scoring a list of records and
+# the preprocessor records are checked with before they are queued.
+def build_scorer(model_path, encoder_path):
+    pipeline = joblib.load(model_path)
+    encoder = joblib.load(encoder_path)
+    preprocessor = BulkPreprocessor(load_feature_schema(model_path, pipeline))
+
+    def score_records(records):
+        labels, probabilities, _ = score_batch(pipeline, encoder, records_to_frame(records))
+        return [{'prediction': str(label), 'probability': float(probability)}
+                for label, probability in zip(labels, probabilities)]
+
+    return score_records, preprocessor
+
+
+# Records under canonical field names, and the rejected fields of every invalid record
+def validate_records(preprocessor, records):
+    checked, rejected = [], []
+    for i, record in enumerate(records):
+        canonical, errors = preprocessor.check_record(record)
+        checked.append(canonical)
+        rejected.extend(dict(error, record=i) for error in errors)
+    return checked, rejected
+
+
+# Threaded HTTP server with a listen backlog sized for bursts of concurrent clients
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_handler(batcher, latency, request_timeout, preprocessor):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok'})
+            elif self.path == '/stats':
+                self._send_json(200, {'latency': latency.summary(), 'batch_size': batcher.batch_stats()})
+            else:
+                self._send_json(404, {'error': f'Unknown path {self.path}'})
+
+        def do_POST(self):
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'null')
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {'error': f'Invalid JSON body: {e}'})
+                return
+
+            if self.path == '/predict':
+                if not isinstance(payload, dict):
+                    self._send_json(400, {'error': 'Expected a JSON object with one customer record'})
+                    return
+                records = [payload]
+            elif self.path == '/predict/batch':
+                records = payload.get('records') if isinstance(payload, dict) else payload
+                if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                    self._send_json(400, {'error': 'Expected a list of customer records'})
+                    return
+            else:
+                self._send_json(404, {'error': f'Unknown path {self.path}'})
+                return
+
+            records, rejected = validate_records(preprocessor, records)
+            if rejected:
+                self._send_json(400, {'error': 'Invalid customer records', 'rejected': rejected})
+                return
+
+            try:
+                results = batcher.submit(records).result(timeout=request_timeout) if records else []
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+                return
+
+            latency.record(time.perf_counter() - start)
+            if self.path == '/predict':
+                self._send_json(200, results[0])
+            else:
+                self._send_json(200, {'predictions': results})
+
+        def log_message(self, format, *args):
+            pass  # Keep the hot path free of per-request logging
+
+    return ScoringHandler
+
+
+# Treat SIGTERM like Ctrl+C so the final latency report is printed
+def _handle_sigterm(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Churn prediction scoring service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--model', default='./Models/best_gbc_tuned.joblib')
+    parser.add_argument('--encoder', default='./Models/label_encoder.joblib')
+    parser.add_argument('--max-batch-size', type=int, default=64, help='Maximum records scored per model call')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='Maximum time a request waits for its batch to fill')
+    parser.add_argument('--request-timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    score_records, preprocessor = build_scorer(args.model, args.encoder)
+    batcher = MicroBatcher(score_records, args.max_batch_size, args.max_wait_ms)
+    latency = LatencyTracker()
+    server = ScoringServer((args.host, args.port), make_handler(batcher, latency, args.request_timeout, preprocessor))
+    print(f'Scoring service listening on http://{args.host}:{args.port}', flush=True)
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print(json.dumps({'latency': latency.summary(), 'batch_size': batcher.batch_stats()}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import io
+import os
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from utils import excel_ingest
+
+
+def workbook(rows, header=('customerID', 'tenure', 'TotalCharges', 'gender')):
+    book = Workbook()
+    sheet = book.active
+    sheet.append(list(header))
+    for row in rows:
+        sheet.append(list(row))
+    upload = io.BytesIO()
+    book.save(upload)
+    upload.name = 'upload.xlsx'
+    return upload
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(excel_ingest, 'UPLOAD_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
+def read_twice(upload, chunk_size=10):
+    _, chunks = excel_ingest.open_excel_upload(upload, chunk_size)
+    first = pd.concat(list(chunks), ignore_index=True)
+    _, chunks = excel_ingest.open_excel_upload(upload, chunk_size)
+    return first, pd.concat(list(chunks), ignore_index=True)
+
+
+# A blank TotalCharges after the first chunk turns the column into text; the upload is still cached
+def test_text_after_first_chunk_is_cached(cache_dir):
+    rows = [(f'id{i}', i, ' ' if i == 25 else i * 3.5, 'Male') for i in range(30)]
+    converted, cached = read_twice(workbook(rows))
+    assert len(os.listdir(cache_dir)) == 1
+    assert cached['TotalCharges'].iloc[25] == ' '
+    expected = pd.to_numeric(converted['TotalCharges'], errors='coerce')
+    pd.testing.assert_series_equal(pd.to_numeric(cached['TotalCharges'], errors='coerce'), expected)
+    assert cached['tenure'].tolist() == list(range(30))
+
+
+def test_fractions_after_whole_numbers_are_cached(cache_dir):
+    rows = [(f'id{i}', i, i * 2 if i < 10 else i + 0.25, 'Male') for i in range(20)]
+    converted, cached = read_twice(workbook(rows))
+    assert len(os.listdir(cache_dir)) == 1
+    assert cached['TotalCharges'].tolist() == pytest.approx(converted['TotalCharges'].astype(float).tolist())
+
+
+def test_short_rows_keep_every_column():
+    upload = workbook([('id0', 1, 2.5, 'Male'), ('id1', 2)])
+    chunk = next(excel_ingest.iter_workbook_chunks(upload, 10))
+    assert list(chunk.columns) == ['customerID', 'tenure', 'TotalCharges', 'gender']
+    assert chunk['gender'].tolist() == ['Male', None]
@@ -0,0 +1,66 @@
+import os
+import warnings
+import joblib
+import numpy as np
+import pytest
+from conftest import ROOT
+from test_tree_compiler import DATASETS, read_features
+from utils.explain import TreeExplainer
+
+MODEL_PATH = os.path.join(ROOT, 'Models', 'best_gbc_tuned.joblib')
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def explainer(pipeline):
+    return TreeExplainer(pipeline)
+
+
+# Expected output below a node of an sklearn tree, averaged over the training samples reaching each leaf
+def expectation(tree, node):
+    left, right = tree.children_left[node], tree.children_right[node]
+    if left == -1:
+        return tree.value[node, 0, 0]
+    weights = tree.weighted_n_node_samples
+    return (weights[left] * expectation(tree, left) + weights[right] * expectation(tree, right)) / (weights[left] + weights[right])
+
+
+# Tree-path contributions of one row, walking every sklearn tree node by node
+def brute_force_contributions(model, x, n_features):
+    contributions = np.zeros(n_features)
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        node = 0
+        while tree.children_left[node] != -1:
+            feature = tree.feature[node]
+            child = tree.children_left[node] if x[feature] <= tree.threshold[node] else tree.children_right[node]
+            contributions[feature] += model.learning_rate * (expectation(tree, child) - expectation(tree, node))
+            node = child
+    return contributions
+
+
+def test_contributions_match_path_expectations(pipeline, explainer):
+    model = pipeline.steps[-1][1]
+    X = explainer.pipeline.transform(read_features(DATASETS[1]).head(5))
+    contributions = explainer.feature_contributions(X)
+    for row in range(len(X)):
+        expected = brute_force_contributions(model, X[row].astype(np.float32), explainer.n_features)
+        np.testing.assert_allclose(contributions[row], expected, rtol=0, atol=1e-9)
+
+
+def test_bias_is_expected_raw_score(pipeline, explainer):
+    model = pipeline.steps[-1][1]
+    roots = sum(expectation(estimator.tree_, 0) for estimator in model.estimators_[:, 0])
+    assert explainer.bias == pytest.approx(explainer.model.init_raw[0] + model.learning_rate * roots, abs=1e-9)
+
+
+def test_contributions_add_up_to_raw_score(explainer):
+    X = explainer.pipeline.transform(read_features(DATASETS[1]))
+    total = explainer.bias + explainer.feature_contributions(X).sum(axis=1)
+    np.testing.assert_allclose(total, explainer.model.raw_predict(X)[:, 0], rtol=0, atol=1e-9)
@@ -0,0 +1,53 @@
+import datetime
+import pandas as pd
+import pytest
+from utils.history_store import _where_clause, append_records, connect, distinct_values, query_history
+
+
+def records(times, model):
+    return pd.DataFrame({'time_of_prediction': times, 'model_used': model, 'prediction': 'No'})
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / 'history.db'), legacy_csv_path=str(tmp_path / 'missing.csv'))
+    days = pd.date_range('2024-01-01', periods=90, freq='7h')
+    for i in range(0, len(days), 10):
+        append_records(records(days[i:i + 10].strftime('%Y-%m-%d %H:%M:%S'), ['A', 'B'][i % 20 // 10]), conn)
+    yield conn
+    conn.close()
+
+
+# The page as a plain scan of the table would return it
+def reference(conn, page_size, before_id=None, **filters):
+    clauses, params = _where_clause(**filters)
+    if before_id is not None:
+        clauses.append('id < ?')
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    return [row[0] for row in conn.execute(f'SELECT id FROM predictions {where} ORDER BY id DESC LIMIT ?', params + [page_size])]
+
+
+QUERIES = [
+    dict(date_from=datetime.date(2024, 1, 5), date_to=datetime.date(2024, 1, 9)),
+    dict(date_from=datetime.date(2024, 1, 20)),
+    dict(date_to=datetime.date(2024, 1, 3), models=['B']),
+    dict(date_from=datetime.date(2025, 1, 1), date_to=datetime.date(2025, 1, 2)),
+    dict(models=['A'], predictions=['No']),
+]
+
+
+@pytest.mark.parametrize('out_of_order', [False, True])
+@pytest.mark.parametrize('filters', QUERIES)
+def test_pages_match_a_table_scan(conn, filters, out_of_order):
+    if out_of_order:
+        append_records(records(['2024-01-04 12:00:00'], 'C'), conn)
+    for before_id in (None, 60, 20):
+        assert query_history(conn, 7, before_id, **filters)['id'].tolist() == reference(conn, 7, before_id, **filters)
+
+
+def test_filter_values_follow_appends(conn):
+    assert distinct_values(conn, 'model_used') == ['A', 'B']
+    append_records(records(['2024-03-01 00:00:00'], 'C'), conn)
+    assert distinct_values(conn, 'model_used') == ['A', 'B', 'C']
+    assert distinct_values(conn, 'prediction') == ['No']
@@ -0,0 +1,34 @@
+import json
+import os
+import pandas as pd
+import pytest
+from conftest import ROOT
+from utils.preprocess import BulkPreprocessor
+
+
+@pytest.fixture(scope='module')
+def preprocessor():
+    with open(os.path.join(ROOT, 'Models', 'manifest.json'), encoding='utf-8') as file:
+        manifest = json.load(file)['models']
+    return BulkPreprocessor(next(iter(manifest.values()))['feature_schema'])
+
+
+@pytest.fixture
+def chunk(preprocessor):
+    row = {col: 1.5 for col in preprocessor.numeric}
+    row.update({col: dtype.categories[0] for col, dtype in preprocessor.categorical.items()})
+    row.update({col: 0 for col in preprocessor.columns if col not in row})
+    return pd.DataFrame([row, row])
+
+
+def test_headers_are_matched_loosely(preprocessor, chunk):
+    chunk = chunk.rename(columns={'TotalCharges': 'Total Charges', 'tenure': 'TENURE'})
+    features, _, errors = preprocessor.transform(chunk)
+    assert len(features) == 2 and errors.empty
+
+
+def test_colliding_headers_are_a_file_error(preprocessor, chunk):
+    chunk = chunk.rename(columns={'TotalCharges': 'Total Charges'})
+    chunk['total_charges'] = 3.0
+    with pytest.raises(ValueError, match="'Total Charges', 'total_charges' all map to TotalCharges"):
+        preprocessor.transform(chunk)
@@ -0,0 +1,61 @@
+import json
+import os
+import pytest
+from conftest import ROOT
+from scoring_service import validate_records
+from utils.batcher import MicroBatcher
+from utils.preprocess import BulkPreprocessor
+
+
+@pytest.fixture(scope='module')
+def preprocessor():
+    with open(os.path.join(ROOT, 'Models', 'manifest.json'), encoding='utf-8') as file:
+        manifest = json.load(file)['models']
+    return BulkPreprocessor(next(iter(manifest.values()))['feature_schema'])
+
+
+@pytest.fixture
+def record(preprocessor):
+    record = {col: 1.5 for col in preprocessor.numeric}
+    record.update({col: dtype.categories[0] for col, dtype in preprocessor.categorical.items()})
+    record.update({col: 0 for col in preprocessor.columns if col not in record})
+    return record
+
+
+def test_valid_record_passes(preprocessor, record):
+    checked, rejected = validate_records(preprocessor, [dict(record, TotalCharges=' ', tenure='12')])
+    assert rejected == []
+    assert set(checked[0]) == set(preprocessor.columns)
+
+
+def test_rejected_fields_are_listed(preprocessor, record):
+    _, rejected = validate_records(preprocessor, [record, dict(record, tenure='abc', Contract='Weekly')])
+    assert [(error['record'], error['column']) for error in rejected] == [(1, 'tenure'), (1, 'Contract')]
+
+
+def test_empty_record_is_rejected(preprocessor):
+    _, rejected = validate_records(preprocessor, [{}])
+    assert {error['column'] for error in rejected} == set(preprocessor.columns)
+
+
+def test_headers_are_normalized(preprocessor, record):
+    record['total charges'] = record.pop('TotalCharges')
+    checked, rejected = validate_records(preprocessor, [record])
+    assert rejected == [] and 'TotalCharges' in checked[0]
+
+
+# A failing batch is scored again request by request, so only the bad request fails
+def test_batch_failure_only_fails_the_bad_request():
+    def score(records):
+        if any(record.get('bad') for record in records):
+            raise ValueError('bad record')
+        return [record['x'] for record in records]
+
+    # The long wait gathers every request into one batch
+    batcher = MicroBatcher(score, max_batch_size=64, max_wait_ms=500)
+    futures = [batcher.submit([{'x': i}]) for i in range(4)] + [batcher.submit([{'bad': True}])]
+    assert [future.result(timeout=5) for future in futures[:-1]] == [[0], [1], [2], [3]]
+    with pytest.raises(ValueError):
+        futures[-1].result(timeout=5)
+    assert batcher.batch_stats()['max_size'] == 5
+    batcher.close()
@@ -0,0 +1,114 @@
+import os
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from conftest import ROOT
+from utils import tree_compiler
+from utils.scoring import FEATURE_COLUMNS, NUMERIC_FEATURES
+from utils.tree_compiler import CompiledGradientBoosting, CompiledPipeline, check_parity
+
+MODEL_PATH = os.path.join(ROOT, 'Models', 'best_gbc_tuned.joblib')
+
+DATASETS = ['Data/churn_data.csv', 'Data/LP2_Telco-churn-second-2000.csv', 'Data/Telco-churn-last-2000.xlsx']
+
+# Both evaluators add the same float64 leaf values, only in a different order
+ATOL = 1e-9
+
+
+def read_features(path):
+    path = os.path.join(ROOT, path)
+    df = pd.read_excel(path) if path.endswith('.xlsx') else pd.read_csv(path)
+    df = df.reindex(columns=FEATURE_COLUMNS)
+    for col in NUMERIC_FEATURES:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+@pytest.fixture(scope='module')
+def pipeline():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return joblib.load(MODEL_PATH)
+
+
+@pytest.fixture(scope='module')
+def compiled(pipeline):
+    return CompiledPipeline(pipeline)
+
+
+# Without numba the NumPy evaluator is used; both are checked where numba is installed
+@pytest.fixture(params=['default', 'numpy'])
+def evaluator(request, monkeypatch):
+    if request.param == 'numpy':
+        monkeypatch.setattr(tree_compiler, '_numba_leaf_sum', None)
+    return request.param
+
+
+# Rows the form and uploads can produce that the training data never had
+@pytest.fixture
+def edge_rows():
+    df = read_features(DATASETS[0]).head(6).reset_index(drop=True)
+    df = df.astype({col: object for col in df.columns if df[col].dtype == bool})
+    df.loc[0, 'TotalCharges'] = np.nan
+    df.loc[1, NUMERIC_FEATURES] = np.nan
+    df.loc[2, 'InternetService'] = 'Satellite'
+    df.loc[3, ['Contract', 'PaymentMethod']] = ['Weekly', 'Cash']
+    df.loc[4, 'gender'] = np.nan
+    df.loc[5, FEATURE_COLUMNS] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('path', DATASETS)
+def test_predict_proba_matches_sklearn(pipeline, compiled, evaluator, path):
+    assert check_parity(pipeline, compiled, read_features(path)) <= ATOL
+
+
+def test_edge_rows_match_sklearn(pipeline, compiled, evaluator, edge_rows):
+    np.testing.assert_allclose(compiled.predict_proba(edge_rows), pipeline.predict_proba(edge_rows), rtol=0, atol=ATOL)
+    np.testing.assert_array_equal(compiled.predict(edge_rows), pipeline.predict(edge_rows))
+
+
+def test_missing_model_inputs_follow_missing_left(compiled, evaluator):
+    X = compiled.transform(read_features(DATASETS[1]).head(50))
+    X[::3, :] = np.nan
+    X[1::3, ::2] = np.nan
+    model = compiled.model
+    # The NumPy path walks the trees in Python, so it is the reference for the numba kernel
+    leaves = model.apply(X.astype(np.float32))
+    expected = model.init_raw + model.learning_rate * model.value[np.arange(model.n_trees)[None, :], leaves].sum(axis=1)[:, None]
+    np.testing.assert_allclose(model.raw_predict(X), expected, rtol=0, atol=ATOL)
+
+
+def test_multiclass_matches_sklearn(evaluator):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 5))
+    y = np.digitize(X[:, 0] + X[:, 1] * X[:, 2], [-0.5, 0.5])
+    model = GradientBoostingClassifier(n_estimators=20, max_depth=4, random_state=0).fit(X, y)
+    compiled_model = CompiledGradientBoosting.from_estimator(model)
+    np.testing.assert_allclose(compiled_model.predict_proba(X), model.predict_proba(X), rtol=0, atol=ATOL)
+    np.testing.assert_array_equal(compiled_model.predict(X), model.predict(X))
+
+
+@pytest.mark.parametrize('mmap_mode', ['r', None])
+def test_save_load_round_trip(pipeline, compiled, edge_rows, tmp_path, mmap_mode):
+    folder = str(tmp_path / 'model.compiled')
+    compiled.save(folder, version='v1')
+    loaded = CompiledPipeline.load(folder, mmap_mode=mmap_mode)
+    assert CompiledPipeline.saved_version(folder) == 'v1'
+    assert loaded.model.depth == compiled.model.depth
+    np.testing.assert_array_equal(loaded.classes_, compiled.classes_)
+
+    df = pd.concat([read_features(DATASETS[1]), edge_rows], ignore_index=True)
+    np.testing.assert_array_equal(loaded.predict_proba(df), compiled.predict_proba(df))
+    assert check_parity(pipeline, loaded, df) <= ATOL
+
+
+def test_save_replaces_existing_folder(compiled, tmp_path):
+    folder = str(tmp_path / 'model.compiled')
+    compiled.save(folder, version='v1')
+    compiled.save(folder, version='v2')
+    assert CompiledPipeline.saved_version(folder) == 'v2'
+    assert [name for name in os.listdir(tmp_path)] == ['model.compiled']
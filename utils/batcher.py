@@ -0,0 +1,102 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+
+
+# Rolling window of request latencies, reported as percentiles
+class LatencyTracker:
+    def __init__(self, window=10_000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=float)
+            count = self.count
+        if len(samples) == 0:
+            return {'count': count, 'p50_ms': None, 'p99_ms': None}
+        p50, p99 = np.percentile(samples, [50, 99]) * 1000
+        return {'count': count, 'p50_ms': round(p50, 3), 'p99_ms': round(p99, 3)}
+
+
+# Collects records submitted from many threads into micro-batches and scores
+# each batch with one call of score_fn(records) -> list of results
+class MicroBatcher:
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=5.0):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._batch_sizes = deque(maxlen=10_000)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    # Queue a list of records; the future resolves to their results in order
+    def submit(self, records):
+        future = Future()
+        self._queue.put((records, future))
+        return future
+
+    # Size of the recent batches, to check how well requests are being coalesced
+    def batch_stats(self):
+        sizes = np.fromiter(tuple(self._batch_sizes), dtype=float)
+        if len(sizes) == 0:
+            return {'batches': 0, 'mean_size': None, 'max_size': None}
+        return {'batches': len(sizes), 'mean_size': round(sizes.mean(), 2), 'max_size': int(sizes.max())}
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    # Wait for the first request, then gather more until the batch is full or max_wait passes
+    def _collect(self, first):
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Handle the shutdown after this batch
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            records = [record for item_records, _ in batch for record in item_records]
+            self._batch_sizes.append(len(records))
+            try:
+                results = self.score_fn(records)
+            except Exception:
+                # Score each request on its own, so one bad request does not fail the others in its batch
+                for item_records, future in batch:
+                    try:
+                        future.set_result(self.score_fn(item_records))
+                    except Exception as e:
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_records, future in batch:
+                future.set_result(results[offset:offset + len(item_records)])
+                offset += len(item_records)
@@ -0,0 +1,67 @@
+import numpy as np
+import streamlit as st
+from utils.data_loader import DATASET_PATH, dataset_version, load_dataset
+
+# Columns the dashboard can filter on; adding one here makes it filterable at no per-rerun cost
+FILTER_COLUMNS = [
+    'gender', 'PaymentMethod', 'Contract',
+    'Partner', 'Dependents', 'PhoneService', 'MultipleLines', 'InternetService', 'OnlineSecurity',
+    'OnlineBackup', 'DeviceProtection', 'TechSupport', 'StreamingTV', 'StreamingMovies', 'PaperlessBilling',
+]
+
+# Number of set bits in every possible byte
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+# One packed bitmap per value of each filter column, rows selected with bitwise AND/OR
+class BitmapIndex:
+    def __init__(self, data, columns=FILTER_COLUMNS):
+        self.n_rows = len(data)
+        self.bitmaps = {}
+        for col in columns:
+            values = data[col].astype('category')
+            codes = values.cat.codes.to_numpy()
+            self.bitmaps[col] = {value: np.packbits(codes == code) for code, value in enumerate(values.cat.categories)}
+
+    # Values of a column that occur in the data, in category order
+    def values(self, col):
+        return list(self.bitmaps[col])
+
+    # Bitmap of the rows matching every filter (values of one column are ORed); None when no filter is active
+    def select(self, filters):
+        selection = None
+        for col, values in filters.items():
+            if not values:
+                continue
+            column_bitmaps = self.bitmaps[col]
+            empty = np.zeros_like(next(iter(column_bitmaps.values())))
+            matched = np.bitwise_or.reduce([column_bitmaps.get(value, empty) for value in values])
+            selection = matched if selection is None else selection & matched
+        return selection
+
+    def count(self, bitmap):
+        return self.n_rows if bitmap is None else int(POPCOUNT[bitmap].sum())
+
+    # Row positions of a bitmap, for DataFrame.iloc
+    def positions(self, bitmap):
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
+
+    # Rows of the data matching the filters; the shared frame itself when nothing is filtered
+    def filter(self, data, filters):
+        bitmap = self.select(filters)
+        if bitmap is None:
+            return data
+        return data.iloc[self.positions(bitmap)]
+
+    def nbytes(self):
+        return sum(bitmap.nbytes for column in self.bitmaps.values() for bitmap in column.values())
+
+
+# Index of one dataset version, built once and shared by all sessions
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_bitmap_index(path, version):
+    return BitmapIndex(load_dataset(path))
+
+
+def load_bitmap_index(path=DATASET_PATH):
+    return _load_bitmap_index(path, dataset_version(path))
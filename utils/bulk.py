@@ -0,0 +1,82 @@
+import pandas as pd
+from utils.scoring import score_batch
+from utils.prediction_cache import score_with_cache
+
+# Number of rows read and scored at a time in bulk mode
+CHUNK_SIZE = 10_000
+
+# Number of scored rows kept in memory for the on-page preview
+PREVIEW_ROWS = 200
+
+
+# Count the data rows of a CSV upload without parsing it
+def count_csv_rows(uploaded_file, block_size=1 << 20):
+    uploaded_file.seek(0)
+    newlines = 0
+    last_byte = b'\n'
+    for block in iter(lambda: uploaded_file.read(block_size), b''):
+        newlines += block.count(b'\n')
+        last_byte = block[-1:]
+    uploaded_file.seek(0)
+    # The last line may not end with a newline, and the first line is the header
+    if last_byte != b'\n':
+        newlines += 1
+    return max(newlines - 1, 0)
+
+
+# Open an uploaded CSV/Excel file as (total_rows, iterator of DataFrame chunks)
+def open_upload(uploaded_file, chunk_size=CHUNK_SIZE):
+    file_extension = uploaded_file.name.split('.')[-1].lower()
+
+    if file_extension == 'csv':
+        total_rows = count_csv_rows(uploaded_file)
+        return total_rows, pd.read_csv(uploaded_file, chunksize=chunk_size)
+
+    # .xlsx workbooks are streamed in read-only mode and cached by content hash
+    if file_extension == 'xlsx':
+        # openpyxl and pyarrow are only imported once a workbook is uploaded
+        from utils.excel_ingest import open_excel_upload
+        return open_excel_upload(uploaded_file, chunk_size)
+
+    # Legacy .xls files cannot be streamed, so slice the loaded sheet instead
+    df = pd.read_excel(uploaded_file)
+    chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+    return len(df), chunks
+
+
+# Score one preprocessed chunk and return the IDs, features, predicted churn and probability.
+# With a cache, duplicate and previously seen customers are not scored again.
+# With an explainer, the top_k input columns driving each score are added as well.
+def score_chunk(features, ids, pipeline, encoder, cache=None, model_version=None, explainer=None, explanation_cache=None, top_k=3):
+    if cache is not None:
+        prediction, probability = score_with_cache(pipeline, encoder, features, cache, model_version)
+    else:
+        prediction, probability, _ = score_batch(pipeline, encoder, features)
+
+    scored = pd.concat([ids, features], axis=1)
+    scored['Churn'] = prediction
+    scored['probability'] = probability
+
+    if explainer is not None:
+        from utils.explain import explain_with_cache, top_drivers
+        if explanation_cache is not None:
+            contributions = explain_with_cache(explainer, features, explanation_cache, model_version)
+        else:
+            contributions = explainer.contributions(features)
+        scored = pd.concat([scored, top_drivers(contributions, explainer.columns, top_k, index=scored.index)], axis=1)
+    return scored
+
+
+# Preprocess and score chunks one after another in this process.
+# Yields (rows read, scored rows, rejected values) per chunk, in input order.
+# row_offset is the number of input rows before the first chunk, for error reports.
+def iter_scored_chunks(chunks, preprocessor, pipeline, encoder, cache=None, model_version=None, explainer=None, explanation_cache=None, top_k=3,
+                       row_offset=0):
+    rows_read = row_offset
+    for chunk in chunks:
+        chunk_rows = len(chunk)
+        features, ids, errors = preprocessor.transform(chunk, row_offset=rows_read)
+        rows_read += chunk_rows
+        scored = score_chunk(features, ids, pipeline, encoder, cache, model_version, explainer, explanation_cache, top_k) if len(features) else None
+        yield chunk_rows, scored, errors
+
@@ -0,0 +1,74 @@
+import pandas as pd
+import streamlit as st
+from utils.data_loader import DATASET_PATH, dataset_version, load_dataset
+
+# Dashboard filter columns plus tenure, the dimensions the cube is aggregated over
+FILTER_DIMENSIONS = ['gender', 'PaymentMethod', 'Contract']
+CUBE_DIMENSIONS = FILTER_DIMENSIONS + ['tenure']
+
+
+# Aggregate the dataset into one cell per combination of the cube dimensions
+def build_cube(data):
+    measures = pd.DataFrame({
+        'churned': (data['Churn'] == 'Yes').astype('int64'),
+        'monthly_charges_count': data['MonthlyCharges'].notna().astype('int64'),
+        'total_charges_count': data['TotalCharges'].notna().astype('int64'),
+        'MonthlyCharges': data['MonthlyCharges'],
+        'TotalCharges': data['TotalCharges'],
+    })
+    measures[CUBE_DIMENSIONS] = data[CUBE_DIMENSIONS]
+
+    cube = measures.groupby(CUBE_DIMENSIONS, observed=True, dropna=False).agg(
+        customers=('churned', 'size'),
+        churned=('churned', 'sum'),
+        monthly_charges_sum=('MonthlyCharges', 'sum'),
+        monthly_charges_count=('monthly_charges_count', 'sum'),
+        total_charges_sum=('TotalCharges', 'sum'),
+        total_charges_count=('total_charges_count', 'sum'),
+    )
+    return cube.reset_index()
+
+
+# Cube cells matching the selected filter values (empty selection = no filter)
+def slice_cube(cube, filters):
+    mask = pd.Series(True, index=cube.index)
+    for col, values in filters.items():
+        if values:
+            mask &= cube[col].isin(values)
+    return cube[mask]
+
+
+# Headline KPIs of a cube slice
+def cube_kpis(cells):
+    total_customers = int(cells['customers'].sum())
+    churned_customers = int(cells['churned'].sum())
+    monthly_count = cells['monthly_charges_count'].sum()
+    total_count = cells['total_charges_count'].sum()
+    return {
+        'total_customers': total_customers,
+        'churned_customers': churned_customers,
+        'churn_rate': churned_customers / total_customers * 100 if total_customers else 0.0,
+        'avg_monthly_charge': cells['monthly_charges_sum'].sum() / monthly_count if monthly_count else 0.0,
+        'avg_total_charge': cells['total_charges_sum'].sum() / total_count if total_count else 0.0,
+        'avg_tenure': (cells['tenure'] * cells['customers']).sum() / total_customers if total_customers else 0.0,
+    }
+
+
+# Average monthly charges and churn rate per tenure of a cube slice
+def tenure_trend(cells):
+    by_tenure = cells.groupby('tenure')[['customers', 'churned', 'monthly_charges_sum', 'monthly_charges_count']].sum()
+    return pd.DataFrame({
+        'tenure': by_tenure.index,
+        'MonthlyCharges': (by_tenure['monthly_charges_sum'] / by_tenure['monthly_charges_count']).values,
+        'Churn Rate': (by_tenure['churned'] / by_tenure['customers'] * 100).values,
+    })
+
+
+# Cube of one dataset version, built once and shared by all sessions
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _load_cube(path, version):
+    return build_cube(load_dataset(path))
+
+
+def load_cube(path=DATASET_PATH):
+    return _load_cube(path, dataset_version(path))
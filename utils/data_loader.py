@@ -0,0 +1,96 @@
+import hashlib
+import os
+import pandas as pd
+import streamlit as st
+from utils import metrics
+
+# Path to the churn dataset used by the Data and Dashboard pages
+DATASET_PATH = 'Data/churn_data.csv'
+
+# Folder holding the binary sidecars of parsed datasets
+CACHE_DIR = 'Data/.cache'
+
+# Columns kept as plain strings instead of categories
+ID_COLUMNS = ['customerID']
+
+
+# Cheap per-rerun check of whether a file changed
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# SHA-256 of a file's content, read in blocks
+def content_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Parse the dataset CSV into compact dtypes
+def parse_dataset(path):
+    data = pd.read_csv(path)
+    data = data.drop(columns=['Unnamed: 0'], errors='ignore')  # Remove the saved index column
+
+    # Yes/No and other low-cardinality string columns become categoricals
+    for col in data.select_dtypes(include=['object']).columns:
+        if col not in ID_COLUMNS:
+            data[col] = data[col].astype('category')
+    return data
+
+
+# Sidecar path for a given content hash of the source file
+def sidecar_path(path, digest):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f'{name}.{digest[:16]}.parquet')
+
+
+# Delete sidecars written for older versions of the same file
+def _remove_stale_sidecars(path, current_path):
+    prefix = os.path.splitext(os.path.basename(path))[0] + '.'
+    for entry in os.listdir(CACHE_DIR):
+        stale_path = os.path.join(CACHE_DIR, entry)
+        if entry.startswith(prefix) and entry.endswith('.parquet') and stale_path != current_path:
+            os.remove(stale_path)
+
+
+# Content hash of a file, recomputed only when its signature changes
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _dataset_version(path, signature):
+    return content_hash(path)
+
+
+# Load a dataset from its Parquet sidecar, parsing the CSV only when no sidecar matches
+@st.cache_resource(show_spinner='Loading dataset...', max_entries=4)
+def _load_dataset(path, digest):
+    cached_path = sidecar_path(path, digest)
+    if os.path.exists(cached_path):
+        try:
+            return pd.read_parquet(cached_path)
+        except Exception:
+            pass  # Corrupt or unreadable sidecar: rebuild it from the CSV
+
+    data = parse_dataset(path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f'{cached_path}.{os.getpid()}.tmp'
+        data.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cached_path)
+        _remove_stale_sidecars(path, cached_path)
+    except Exception:
+        pass  # Parquet support is optional, the parsed frame is still cached in memory
+    return data
+
+
+# Version of the dataset: the content hash of the file, changing whenever its content does
+def dataset_version(path=DATASET_PATH):
+    return _dataset_version(path, file_signature(path))
+
+
+# Shared, read-only dataset: all sessions get the same DataFrame object.
+# Callers must not modify it in place.
+def load_dataset(path=DATASET_PATH):
+    with metrics.timed('dataset_load', dataset=os.path.basename(path)):
+        return _load_dataset(path, dataset_version(path))
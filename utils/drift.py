@@ -0,0 +1,202 @@
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.data_loader import DATASET_PATH, dataset_version, load_dataset
+from utils.history_store import HISTORY_DB_PATH, connect
+from utils.history_writer import get_history_writer
+from utils.scoring import FEATURE_COLUMNS, NUMERIC_FEATURES
+
+# Features compared with the training data
+DRIFT_NUMERIC = list(NUMERIC_FEATURES)
+DRIFT_CATEGORICAL = [col for col in FEATURE_COLUMNS if col not in NUMERIC_FEATURES]
+
+# Numeric features are bucketed into quantile bins of the training data
+N_BINS = 10
+
+MISSING = 'missing'
+
+# Floor for empty buckets, so PSI stays finite
+PSI_EPSILON = 1e-4
+
+# Usual PSI reading: below 0.1 stable, up to 0.25 moderate shift, above that significant
+PSI_THRESHOLDS = (0.1, 0.25)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drift_counts (
+    feature TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (feature, bucket)
+);
+"""
+
+UPSERT_SQL = "INSERT INTO drift_counts (feature, bucket, count) VALUES (?, ?, ?) ON CONFLICT (feature, bucket) DO UPDATE SET count = count + excluded.count"
+
+# Rows written by other processes that make a page render fold them in; fewer are left for later
+REFRESH_MIN_ROWS = 500
+
+# History stores SeniorCitizen as Yes/No, the training data as booleans
+CATEGORY_ALIASES = {'True': 'Yes', 'False': 'No', '1': 'Yes', '0': 'No', '1.0': 'Yes', '0.0': 'No'}
+
+
+# Bucket labels of one feature: bin numbers for numeric features, the value itself for categoricals
+def bucketize(values, edges=None):
+    if edges is not None:
+        numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+        labels = np.searchsorted(edges, numbers, side='right').astype(str).astype(object)
+        labels[np.isnan(numbers)] = MISSING
+        return pd.Series(labels, index=values.index)
+    return values.astype(object).map(lambda value: MISSING if pd.isna(value) else CATEGORY_ALIASES.get(str(value), str(value)))
+
+
+# Share of each bucket of every drift feature in the training data
+class DriftBaseline:
+    def __init__(self, data, version):
+        self.version = version
+        self.edges = {}
+        self.expected = {}
+        for col in DRIFT_NUMERIC:
+            values = pd.to_numeric(data[col], errors='coerce').dropna()
+            self.edges[col] = np.unique(np.quantile(values, np.linspace(0, 1, N_BINS + 1)[1:-1]))
+        for col in DRIFT_NUMERIC + DRIFT_CATEGORICAL:
+            self.expected[col] = bucketize(data[col], self.edges.get(col)).value_counts(normalize=True).to_dict()
+
+    # Bucket counts of a batch of records, as (feature, bucket, count) rows
+    def count(self, df):
+        rows = []
+        for col in DRIFT_NUMERIC + DRIFT_CATEGORICAL:
+            counts = bucketize(df[col], self.edges.get(col)).value_counts()
+            rows.extend((col, bucket, int(n)) for bucket, n in counts.items())
+        return rows
+
+
+def psi(expected, observed):
+    buckets = sorted(set(expected) | set(observed))
+    e = np.maximum(np.array([expected.get(b, 0.0) for b in buckets]), PSI_EPSILON)
+    o = np.maximum(np.array([observed.get(b, 0.0) for b in buckets]), PSI_EPSILON)
+    return float(np.sum((o - e) * np.log(o / e)))
+
+
+# KS distance between two binned distributions of an ordered feature (largest gap of their CDFs)
+def binned_ks(expected, observed, n_bins):
+    buckets = [str(i) for i in range(n_bins)]
+    e = np.array([expected.get(b, 0.0) for b in buckets])
+    o = np.array([observed.get(b, 0.0) for b in buckets])
+    e = e / e.sum() if e.sum() else e
+    o = o / o.sum() if o.sum() else o
+    return float(np.max(np.abs(np.cumsum(e) - np.cumsum(o))))
+
+
+# Incremental drift summaries of the prediction history. Rows are folded in exactly once,
+# in order of id, so scores never need a scan of the whole history.
+class DriftMonitor:
+    def __init__(self, baseline, db_path=HISTORY_DB_PATH):
+        self.baseline = baseline
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    # Whether at least min_rows history rows are waiting to be folded in (or the counts belong to
+    # another baseline), checked with reads only so it never waits for the history writer's lock
+    def _due(self, conn, min_rows):
+        meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('drift_baseline', 'drift_last_id')").fetchall())
+        if meta.get('drift_baseline') != self.baseline.version:
+            return True
+        new_rows = conn.execute('SELECT COUNT(*) FROM (SELECT 1 FROM predictions WHERE id > ? LIMIT ?)',
+                                (int(meta.get('drift_last_id', 0)), min_rows)).fetchone()[0]
+        return new_rows >= min_rows
+
+    # Fold history rows written since the last refresh into the bucket counts, once at least min_rows are waiting
+    def refresh(self, chunk_size=50_000, min_rows=1):
+        with self._lock:
+            conn = connect(self.db_path)
+            try:
+                conn.executescript(SCHEMA)
+                if not self._due(conn, min_rows):
+                    return 0
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('drift_baseline', 'drift_last_id')").fetchall())
+                    last_id = int(meta.get('drift_last_id', 0))
+                    # Counts made against another version of the training data start over
+                    if meta.get('drift_baseline') != self.baseline.version:
+                        conn.execute('DELETE FROM drift_counts')
+                        last_id = 0
+                    columns = ', '.join(f'"{col}"' for col in DRIFT_NUMERIC + DRIFT_CATEGORICAL)
+                    folded = 0
+                    while True:
+                        chunk = pd.read_sql_query(f'SELECT id, {columns} FROM predictions WHERE id > ? ORDER BY id LIMIT ?',
+                                                  conn, params=(last_id, chunk_size))
+                        if chunk.empty:
+                            break
+                        conn.executemany(UPSERT_SQL, self.baseline.count(chunk))
+                        last_id = int(chunk['id'].iloc[-1])
+                        folded += len(chunk)
+                    conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                                     [('drift_baseline', self.baseline.version), ('drift_last_id', str(last_id))])
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            finally:
+                conn.close()
+        return folded
+
+    # Drift score of every feature, computed from the bucket counts only
+    def scores(self):
+        conn = connect(self.db_path)
+        try:
+            conn.executescript(SCHEMA)
+            counts = pd.read_sql_query('SELECT feature, bucket, count FROM drift_counts', conn)
+        finally:
+            conn.close()
+
+        rows = []
+        for col in DRIFT_NUMERIC + DRIFT_CATEGORICAL:
+            feature_counts = counts[counts['feature'] == col]
+            observed_rows = int(feature_counts['count'].sum())
+            observed = dict(zip(feature_counts['bucket'], feature_counts['count'] / observed_rows)) if observed_rows else {}
+            expected = self.baseline.expected[col]
+            score = psi(expected, observed) if observed_rows else None
+            ks = binned_ks(expected, observed, len(self.baseline.edges[col]) + 1) if observed_rows and col in DRIFT_NUMERIC else None
+            if score is None:
+                status = 'no data'
+            else:
+                status = 'stable' if score < PSI_THRESHOLDS[0] else 'moderate' if score < PSI_THRESHOLDS[1] else 'significant'
+            rows.append({'feature': col, 'psi': score, 'ks': ks, 'rows': observed_rows, 'status': status})
+        return pd.DataFrame(rows)
+
+    def on_batch(self, batch):
+        self.refresh()
+
+
+# Baseline of one version of the training data, built once
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_drift_monitor(path, version):
+    return DriftMonitor(DriftBaseline(load_dataset(path), version))
+
+
+# Writer and monitor callback currently registered; only the current monitor is kept up to date
+_listener_lock = threading.Lock()
+_listener = (None, None)
+
+
+# Keep the summaries current as the history writer commits each batch. A monitor of another
+# dataset version would clear and rebuild the shared counts on every batch, so it stops listening.
+def _listen(monitor):
+    global _listener
+    writer = get_history_writer()
+    with _listener_lock:
+        if _listener == (writer, monitor.on_batch):
+            return
+        previous_writer, previous_callback = _listener
+        if previous_writer is not None:
+            previous_writer.remove_listener(previous_callback)
+        writer.add_listener(monitor.on_batch)
+        _listener = (writer, monitor.on_batch)
+
+
+def get_drift_monitor(path=DATASET_PATH):
+    monitor = _load_drift_monitor(path, dataset_version(path))
+    _listen(monitor)
+    return monitor
@@ -0,0 +1,211 @@
+import glob
+import hashlib
+import os
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+# Converted spreadsheets, stored as Parquet under the content hash of the upload
+UPLOAD_CACHE_DIR = 'Data/.cache/uploads'
+
+# Converted uploads are dropped after a week unused, and least recently used first above this size
+UPLOAD_CACHE_MAX_BYTES = 512 * 1024 * 1024
+UPLOAD_CACHE_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+# SHA-256 of an uploaded file's content, read in blocks
+def upload_digest(uploaded_file, block_size=1 << 20):
+    uploaded_file.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: uploaded_file.read(block_size), b''):
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+# Build a typed column from spreadsheet cell values. Columns mixing text and
+# numbers (e.g. blank TotalCharges stored as ' ') are kept as text.
+def _typed_column(values):
+    column = pd.Series(values)
+    if column.dtype == object:
+        types = set(map(type, column.dropna()))
+        if len(types) > 1:
+            column = column.map(lambda value: value if value is None else str(value))
+    return column
+
+
+# Turn a list of row tuples into a DataFrame built column by column
+def _rows_to_frame(header, rows):
+    return pd.DataFrame({name: _typed_column(values) for name, values in zip(header, zip(*rows))})
+
+
+# Stream the first sheet of a workbook in read-only mode as DataFrame chunks
+def iter_workbook_chunks(uploaded_file, chunk_size):
+    uploaded_file.seek(0)
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(name) for name in next(rows, ())]
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue  # Skip blank lines, read-only sheets often report trailing empty rows
+            # Rows with empty trailing cells come back shorter than the header, pad them so no column is cut
+            batch.append(tuple(row[:len(header)]) + (None,) * (len(header) - len(row)))
+            if len(batch) == chunk_size:
+                yield _rows_to_frame(header, batch)
+                batch = []
+        if batch:
+            yield _rows_to_frame(header, batch)
+    finally:
+        workbook.close()
+
+
+# Number of data rows a workbook declares in its dimensions, used for progress only
+def workbook_row_count(uploaded_file):
+    uploaded_file.seek(0)
+    workbook = load_workbook(uploaded_file, read_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+    finally:
+        workbook.close()
+    uploaded_file.seek(0)
+    return max(max_row - 1, 0) if max_row else 0
+
+
+# Cast a chunk to the column types of the first chunk written to the cache,
+# e.g. a column that was text in the first chunk stays text in every chunk
+def _conform(chunk, schema):
+    for field in schema:
+        column = chunk[field.name]
+        if pa.types.is_string(field.type) and column.dtype != object:
+            chunk[field.name] = column.astype(object).where(column.notna(), None).map(lambda value: value if value is None else str(value))
+        elif pa.types.is_floating(field.type) and pd.api.types.is_integer_dtype(column.dtype):
+            chunk[field.name] = column.astype('float64')
+    return chunk
+
+
+# Wider types for the columns of a chunk that do not fit the cache file's schema: integers
+# that became fractional go to float, anything else (e.g. text in a numeric column) to string
+def _widened_types(chunk, schema):
+    types = {}
+    for field in schema:
+        column = chunk[field.name]
+        try:
+            pa.array(column, type=field.type, from_pandas=True)
+        except (pa.ArrowException, ValueError, TypeError):
+            widen_to_float = pa.types.is_integer(field.type) and pd.api.types.is_float_dtype(column.dtype)
+            types[field.name] = pa.float64() if widen_to_float else pa.string()
+    return types
+
+
+# Rewrite the chunks cached so far with some columns widened and return a writer continuing the file.
+# Parquet cannot change the type of a column within a file, so the written row groups are copied over.
+def _widen(writer, tmp_path, types):
+    writer.close()
+    old_path = f'{tmp_path}.old'
+    os.replace(tmp_path, old_path)
+    try:
+        old_file = pq.ParquetFile(old_path)
+        schema = old_file.schema_arrow.remove_metadata()
+        for name, type_ in types.items():
+            index = schema.get_field_index(name)
+            schema = schema.set(index, schema.field(index).with_type(type_))
+        writer = pq.ParquetWriter(tmp_path, schema)
+        for batch in old_file.iter_batches():
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        old_file.close()
+    finally:
+        os.remove(old_path)
+    return writer
+
+
+# Read chunks back from a converted upload
+def _iter_cached_chunks(parquet_file, chunk_size):
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+# Remove converted uploads not used for max_age_seconds, then the least recently used ones
+# until the cache fits in max_bytes. Files of other processes may go at the same time.
+def prune_upload_cache(cache_dir=UPLOAD_CACHE_DIR, max_bytes=UPLOAD_CACHE_MAX_BYTES, max_age_seconds=UPLOAD_CACHE_MAX_AGE_SECONDS):
+    files = []
+    for path in glob.glob(os.path.join(cache_dir, '*.parquet*')):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+
+    now = time.time()
+    total = sum(size for _, size, _ in files)
+    for mtime, size, path in files:
+        # Leftover .tmp files are only removed by age, they may still be being written
+        if now - mtime <= max_age_seconds and (total <= max_bytes or path.endswith('.tmp')):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+# Stream workbook chunks while writing them to the cache. The cache file is only
+# published once the whole sheet converted, so a partial read is never reused.
+def _convert_and_cache(uploaded_file, path, chunk_size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    caching = True
+    try:
+        for chunk in iter_workbook_chunks(uploaded_file, chunk_size):
+            if caching:
+                try:
+                    if writer is None:
+                        table = pa.Table.from_pandas(chunk, preserve_index=False)
+                        writer = pq.ParquetWriter(tmp_path, table.schema)
+                    else:
+                        chunk = _conform(chunk, writer.schema)
+                        try:
+                            table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                        except (pa.ArrowException, ValueError, TypeError):
+                            # A column changed type after the first chunk, e.g. a blank ' ' in TotalCharges
+                            types = _widened_types(chunk, writer.schema)
+                            if not types:
+                                raise
+                            writer = _widen(writer, tmp_path, types)
+                            chunk = _conform(chunk, writer.schema)
+                            table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                    writer.write_table(table)
+                except (pa.ArrowException, ValueError, TypeError):
+                    caching = False  # Chunk could not be converted, score without caching
+            yield chunk
+        if writer is not None:
+            writer.close()
+            writer = None
+            if caching:
+                os.replace(tmp_path, path)
+                prune_upload_cache(os.path.dirname(path))
+    finally:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# Open an .xlsx upload as (total_rows, iterator of DataFrame chunks), reusing the
+# converted copy when the same content was uploaded before
+def open_excel_upload(uploaded_file, chunk_size):
+    path = os.path.join(UPLOAD_CACHE_DIR, f'{upload_digest(uploaded_file)}.parquet')
+    try:
+        parquet_file = pq.ParquetFile(path)
+        # A hit counts as a use, so often uploaded files stay cached
+        os.utime(path)
+    except OSError:
+        pass  # Not converted yet, or pruned
+    else:
+        return parquet_file.metadata.num_rows, _iter_cached_chunks(parquet_file, chunk_size)
+    return workbook_row_count(uploaded_file), _convert_and_cache(uploaded_file, path, chunk_size)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.prediction_cache import PredictionCache, row_hashes
+from utils.tree_compiler import EVAL_BLOCK_ROWS, CompiledPipeline
+
+# Driver columns added to each bulk prediction
+TOP_K_DRIVERS = 3
+
+
+# Input column behind every model feature: one-hot columns map back to the
+# column they encode, scaled numeric columns to themselves
+def feature_sources(pipeline, n_features):
+    transformer = pipeline.transformers[0] if pipeline.transformers else None
+    if transformer is None or not hasattr(transformer, 'transformers_'):
+        names = [f'x{i}' for i in range(n_features)]
+        return names, np.arange(n_features)
+
+    columns, sources = [], []
+    for name, _, cols in transformer.transformers_:
+        if name == 'remainder' or name not in transformer.output_indices_:
+            continue
+        output = transformer.output_indices_[name]
+        if output.stop == output.start:
+            continue
+        cols = list(cols)
+        for feature_name in transformer.get_feature_names_out()[output]:
+            suffix = feature_name.split('__', 1)[-1]
+            # The longest input column that the output name starts with, e.g. 'MultipleLines_No phone service'
+            matches = [col for col in cols if suffix == col or suffix.startswith(f'{col}_')]
+            source = max(matches, key=len) if matches else suffix
+            if source not in columns:
+                columns.append(source)
+            sources.append(columns.index(source))
+    return columns, np.asarray(sources)
+
+
+# Exact tree-path (Saabas) contributions of a binary gradient boosting pipeline,
+# computed level by level over whole batches on the compiled tree arrays.
+# For every row, bias + contributions.sum() equals the model's raw score (log-odds).
+class TreeExplainer:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline if isinstance(pipeline, CompiledPipeline) else CompiledPipeline(pipeline)
+        self.model = self.pipeline.model
+        if self.model.n_outputs != 1:
+            raise ValueError('Contributions are only available for binary classifiers')
+        self.columns, sources = feature_sources(self.pipeline, int(self.model.feature.max()) + 1)
+        self.n_features = len(sources)
+        # Sums model features into the input columns they came from
+        self.grouping = np.zeros((self.n_features, len(self.columns)))
+        self.grouping[np.arange(self.n_features), sources] = 1.0
+        root_values = self.model.value[:, 0]
+        self.bias = float(self.model.init_raw[0] + self.model.learning_rate * root_values.sum())
+
+    # Contribution of every model feature, shape (rows, model features)
+    def feature_contributions(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        model = self.model
+        feature, threshold, missing_left = model.feature.ravel(), model.threshold.ravel(), model.missing_left.ravel()
+        value = model.value.reshape(model.n_trees, -1)
+        # Flat indexing into the raveled arrays is much cheaper than 2-D fancy indexing
+        offsets = (np.arange(model.n_trees) * model.n_internal)[None, :]
+        value_offsets = (np.arange(model.n_trees) * value.shape[1])[None, :]
+        value = value.ravel()
+        contributions = np.zeros((len(X), self.n_features))
+        for start in range(0, len(X), EVAL_BLOCK_ROWS):
+            block = X[start:start + EVAL_BLOCK_ROWS]
+            rows = np.arange(len(block))[:, None]
+            nodes = np.zeros((len(block), model.n_trees), dtype=np.intp)
+            node_values = np.broadcast_to(value[value_offsets], nodes.shape)
+            summed = np.zeros(len(block) * self.n_features)
+            for _ in range(model.depth):
+                flat = offsets + nodes
+                split_feature = feature[flat]
+                x = block.ravel()[rows * X.shape[1] + split_feature]
+                go_right = ~((x <= threshold[flat]) | (np.isnan(x) & missing_left[flat]))
+                nodes = 2 * nodes + 1 + go_right
+                # The change in node value along each step of the path is credited to the split feature;
+                # padding below early leaves repeats the leaf value, so it adds nothing
+                child_values = value[value_offsets + nodes]
+                delta = child_values - node_values
+                summed += np.bincount((rows * self.n_features + split_feature).ravel(), weights=delta.ravel(), minlength=len(summed))
+                node_values = child_values
+            contributions[start:start + len(block)] = summed.reshape(len(block), self.n_features)
+        return contributions * model.learning_rate
+
+    # Contribution of every input column to the churn log-odds, shape (rows, columns)
+    def contributions(self, df):
+        return self.feature_contributions(self.pipeline.transform(df)) @ self.grouping
+
+
+# Contributions through a cache keyed by row hash; duplicate rows are explained once
+def explain_with_cache(explainer, df, cache, model_version):
+    hashes = row_hashes(df)
+    unique_hashes, first_rows, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    keys = [('contributions', model_version, int(h)) for h in unique_hashes]
+
+    cached = cache.get_many(keys)
+    contributions = np.empty((len(keys), len(explainer.columns)))
+    missing = [i for i, entry in enumerate(cached) if entry is None]
+    for i, entry in enumerate(cached):
+        if entry is not None:
+            contributions[i] = entry[0]
+
+    if missing:
+        new_contributions = explainer.contributions(df.iloc[first_rows[missing]])
+        contributions[missing] = new_contributions
+        cache.put_many([keys[i] for i in missing], list(new_contributions))
+
+    return contributions[inverse]
+
+
+# The k input columns pushing each row's churn score the most, either way, with their log-odds impact
+def top_drivers(contributions, columns, k=TOP_K_DRIVERS, index=None):
+    k = min(k, len(columns))
+    order = np.argsort(-np.abs(contributions), axis=1, kind='stable')[:, :k]
+    impacts = np.take_along_axis(contributions, order, axis=1)
+    names = np.asarray(columns, dtype=object)[order]
+    drivers = {}
+    for i in range(k):
+        drivers[f'driver_{i + 1}'] = names[:, i]
+        drivers[f'driver_{i + 1}_impact'] = np.round(impacts[:, i], 4)
+    return pd.DataFrame(drivers, index=index)
+
+
+# Explanation cache shared by every session of the app
+@st.cache_resource(show_spinner=False)
+def get_explanation_cache():
+    return PredictionCache()
@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+import streamlit as st
+
+# Memory budget of the cached figures, measured as the size of their JSON spec
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+# Filter selections in a canonical form: empty filters dropped, values sorted
+def normalize_filters(filters):
+    return tuple(sorted((col, tuple(sorted(map(str, values)))) for col, values in filters.items() if values))
+
+
+def figure_key(dataset_hash, filters, chart_id):
+    return (dataset_hash, normalize_filters(filters), chart_id)
+
+
+# LRU of built Plotly figures shared by all sessions, bounded by the size of their JSON.
+# Cached figures are shared, so callers must not modify them.
+class FigureCache:
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._figures = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        fig = build()
+        # Serialised once, to account for the memory the figure holds
+        size = len(fig.to_json())
+        with self._lock:
+            if key not in self._figures and size <= self.max_bytes:
+                self._figures[key] = (fig, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._figures.popitem(last=False)
+                    self._bytes -= evicted_size
+        return fig
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._figures), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    return FigureCache()
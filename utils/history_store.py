@@ -0,0 +1,216 @@
+import os
+import sqlite3
+import pandas as pd
+from utils.scoring import FEATURE_COLUMNS
+
+# SQLite database holding the prediction history
+HISTORY_DB_PATH = 'Data/history.db'
+
+# CSV file the history used to be appended to, imported once into the database
+LEGACY_CSV_PATH = 'Data/history.csv'
+
+HISTORY_COLUMNS = FEATURE_COLUMNS + ['prediction', 'probability', 'time_of_prediction', 'model_used']
+
+NUMERIC_COLUMNS = {'tenure', 'MonthlyCharges', 'TotalCharges', 'probability'}
+
+QUOTED_COLUMNS = ', '.join(f'"{col}"' for col in HISTORY_COLUMNS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    {', '.join(f'"{col}" {"REAL" if col in NUMERIC_COLUMNS else "TEXT"}' for col in HISTORY_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_time ON predictions (time_of_prediction, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_model ON predictions (model_used, id);
+CREATE INDEX IF NOT EXISTS idx_predictions_prediction ON predictions (prediction, id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS filter_values (column_name TEXT, value TEXT, PRIMARY KEY (column_name, value)) WITHOUT ROWID;
+"""
+
+# Columns whose distinct values populate the history filters, kept in filter_values as rows are appended
+FILTER_COLUMNS = ('model_used', 'prediction')
+
+INSERT_SQL = f"INSERT INTO predictions ({QUOTED_COLUMNS}) VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+
+
+# Open the history database, creating the schema and importing the legacy CSV if needed
+def connect(db_path=HISTORY_DB_PATH, legacy_csv_path=LEGACY_CSV_PATH):
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    # WAL lets the History page read while predictions are being appended
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    import_legacy_csv(conn, legacy_csv_path)
+    build_summaries(conn)
+    return conn
+
+
+# Convert a DataFrame of history records into rows ready for executemany
+def _to_rows(df):
+    df = df.reindex(columns=HISTORY_COLUMNS)
+    df = df.astype(object).where(df.notna(), None)
+    for col in df.columns:
+        if col not in NUMERIC_COLUMNS:
+            df[col] = df[col].map(lambda value: value if value is None else str(value))
+    return list(df.itertuples(index=False, name=None))
+
+
+def _meta(conn, key):
+    row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+
+# Insert records inside an open write transaction, keeping the summaries the page reads current:
+# the distinct filter values, and whether ids still follow time_of_prediction (see _id_range)
+def _insert(conn, df):
+    df = df.reindex(columns=HISTORY_COLUMNS)
+    times = df['time_of_prediction'].dropna().astype(str)
+    if len(times):
+        # Rows of a batch are inserted oldest first, so ids keep following the time
+        df = df.loc[df['time_of_prediction'].astype(str).sort_values(kind='stable').index]
+    conn.executemany(INSERT_SQL, _to_rows(df))
+
+    values = {(col, str(value)) for col in FILTER_COLUMNS for value in df[col].dropna().unique()}
+    conn.executemany('INSERT OR IGNORE INTO filter_values (column_name, value) VALUES (?, ?)', sorted(values))
+    if len(times):
+        time_max = _meta(conn, 'time_max')
+        if time_max is not None and times.min() < time_max:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('time_ordered', '0')")
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('time_max', ?)", (max(times.max(), time_max or ''),))
+
+
+# Append prediction records in a single transaction
+def append_records(df, conn=None):
+    own_conn = conn is None
+    conn = conn or connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            _insert(conn, df)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    finally:
+        if own_conn:
+            conn.close()
+
+
+# One-time scan of a database written before the summaries existed
+def build_summaries(conn):
+    if _meta(conn, 'summaries_built'):
+        return
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if not _meta(conn, 'summaries_built'):
+            for col in FILTER_COLUMNS:
+                conn.execute(f'INSERT OR IGNORE INTO filter_values (column_name, value) '
+                             f'SELECT ?, "{col}" FROM predictions WHERE "{col}" IS NOT NULL GROUP BY "{col}"', (col,))
+            out_of_order = conn.execute('SELECT 1 FROM (SELECT time_of_prediction < LAG(time_of_prediction) OVER (ORDER BY id) AS back '
+                                        'FROM predictions) WHERE back LIMIT 1').fetchone()
+            time_max = conn.execute('SELECT MAX(time_of_prediction) FROM predictions').fetchone()[0]
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                             [('time_ordered', '0' if out_of_order else '1'), ('time_max', time_max or ''), ('summaries_built', '1')])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# One-time import of Data/history.csv into the database
+def import_legacy_csv(conn, csv_path=LEGACY_CSV_PATH, chunk_size=50_000):
+    if not os.path.exists(csv_path):
+        return 0
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_csv_imported'").fetchone():
+        return 0
+
+    # Older versions of the app wrote the header only on the very first append
+    with open(csv_path, 'r', encoding='utf-8') as file:
+        has_header = 'gender' in file.readline()
+    read_kwargs = {'header': 0} if has_header else {'header': None, 'names': ['Unnamed: 0'] + HISTORY_COLUMNS}
+
+    imported = 0
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Another process may have imported it while we waited for the lock
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_csv_imported'").fetchone():
+            conn.rollback()
+            return 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size, **read_kwargs):
+            _insert(conn, chunk)
+            imported += len(chunk)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_csv_imported', ?)", (str(imported),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return imported
+
+
+# Ids of the first and last row in a date range, found through the time index; (None, None) if it is empty.
+# Only valid while ids follow time_of_prediction, otherwise returns False.
+def _id_range(conn, date_from=None, date_to=None):
+    if _meta(conn, 'time_ordered') != '1':
+        return False
+    first = last = None
+    lower = ('time_of_prediction >= ?', [str(date_from)]) if date_from is not None else ('time_of_prediction IS NOT NULL', [])
+    upper = ('time_of_prediction < ?', [str(date_to) + '~']) if date_to is not None else ('1', [])
+    where = f'WHERE {lower[0]} AND {upper[0]}'
+    row = conn.execute(f'SELECT id FROM predictions {where} ORDER BY time_of_prediction, id LIMIT 1', lower[1] + upper[1]).fetchone()
+    if row:
+        first = row[0]
+        last = conn.execute(f'SELECT id FROM predictions {where} ORDER BY time_of_prediction DESC, id DESC LIMIT 1',
+                            lower[1] + upper[1]).fetchone()[0]
+    return first, last
+
+
+# Build the WHERE clause shared by the history queries.
+# index_time=False compares the time with a unary +, which keeps SQLite from choosing the time index.
+def _where_clause(models=None, predictions=None, date_from=None, date_to=None, index_time=True):
+    time_column = 'time_of_prediction' if index_time else '+time_of_prediction'
+    clauses, params = [], []
+    if models:
+        clauses.append(f"model_used IN ({', '.join('?' for _ in models)})")
+        params.extend(models)
+    if predictions:
+        clauses.append(f"prediction IN ({', '.join('?' for _ in predictions)})")
+        params.extend(predictions)
+    if date_from is not None:
+        clauses.append(f'{time_column} >= ?')
+        params.append(str(date_from))
+    if date_to is not None:
+        # Timestamps of the end date itself sort after the bare date
+        clauses.append(f'{time_column} < ?')
+        params.append(str(date_to) + '~')
+    return clauses, params
+
+
+# Fetch one page of history, newest first.
+# Pagination is keyset based: pass the smallest id of the previous page as before_id.
+# A date range is turned into an id range first, so the page is read walking the ids
+# instead of sorting every row of the range.
+def query_history(conn, page_size=50, before_id=None, **filters):
+    id_range = False
+    if filters.get('date_from') is not None or filters.get('date_to') is not None:
+        id_range = _id_range(conn, filters.get('date_from'), filters.get('date_to'))
+        if id_range == (None, None):
+            return pd.read_sql_query('SELECT * FROM predictions LIMIT 0', conn)
+    clauses, params = _where_clause(**filters, index_time=not id_range)
+    if id_range:
+        clauses.append('id BETWEEN ? AND ?')
+        params.extend(id_range)
+    if before_id is not None:
+        clauses.append('id < ?')
+        params.append(before_id)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = f"SELECT * FROM predictions {where} ORDER BY id DESC LIMIT ?"
+    return pd.read_sql_query(sql, conn, params=params + [page_size])
+
+
+# Distinct values of a filter column, read from the summary kept up to date on append
+def distinct_values(conn, column):
+    if column not in FILTER_COLUMNS:
+        raise ValueError(f"Column '{column}' has no filter values")
+    rows = conn.execute('SELECT value FROM filter_values WHERE column_name = ? ORDER BY value', (column,))
+    return [row[0] for row in rows]
@@ -0,0 +1,174 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from utils import metrics
+from utils.batcher import LatencyTracker
+from utils.history_store import HISTORY_COLUMNS, HISTORY_DB_PATH, append_records, connect
+
+logger = logging.getLogger(__name__)
+
+# A batch is committed once it holds this many records...
+FLUSH_MAX_RECORDS = 500
+
+# ...or once its oldest record has waited this long
+FLUSH_INTERVAL_SECONDS = 1.0
+
+# Pause before retrying a batch the database refused (e.g. locked by another process)
+RETRY_DELAY_SECONDS = 0.5
+
+# Attempts at a batch before its submissions are written one by one, and those still failing set aside
+MAX_WRITE_ATTEMPTS = 3
+
+# CSV next to the database collecting the records that could not be written, for inspection or replay
+QUARANTINE_FILE = 'history_quarantine.csv'
+
+
+# Background writer that queues history records from every session and commits
+# them to the history store in batches, one transaction per batch
+class HistoryWriter:
+    def __init__(self, db_path=HISTORY_DB_PATH, max_records=FLUSH_MAX_RECORDS, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.db_path = db_path
+        self.max_records = max_records
+        self.flush_interval = flush_interval
+        self.flush_latency = LatencyTracker()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._batches = 0
+        self._rows_written = 0
+        self._errors = 0
+        self._quarantined = 0
+        self.quarantine_path = os.path.join(os.path.dirname(db_path) or '.', QUARANTINE_FILE)
+        self._listeners = []
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+
+    # Queue a DataFrame of history records, returns immediately
+    def submit(self, df):
+        with self._lock:
+            self._pending += len(df)
+        self._queue.put(df)
+
+    # Called with each committed batch, after the transaction succeeded
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    # Block until everything submitted so far is committed, or the timeout passes
+    def flush(self, timeout=None):
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = {'queue_depth': self._pending, 'batches': self._batches, 'rows_written': self._rows_written, 'errors': self._errors,
+                     'quarantined': self._quarantined}
+        latency = self.flush_latency.summary()
+        stats['flush_p50_ms'] = latency['p50_ms']
+        stats['flush_p99_ms'] = latency['p99_ms']
+        return stats
+
+    # Commit what is queued and stop the writer thread
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    # Wait for the first record, then gather more until the batch is full or flush_interval passes
+    def _run(self):
+        conn = connect(self.db_path)
+        frames, rows, deadline, waiters = [], 0, None, []
+        attempts = 0
+        stopping = False
+        try:
+            while not stopping:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = False
+
+                if item is None:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                elif item is not False:
+                    frames.append(item)
+                    rows += len(item)
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+
+                due = stopping or waiters or rows >= self.max_records or (deadline is not None and time.monotonic() >= deadline)
+                if not due:
+                    continue
+                if frames and not self._commit(conn, frames, rows):
+                    attempts += 1
+                    # Keep the batch and try again shortly, unless the process is shutting down
+                    if not stopping and attempts < MAX_WRITE_ATTEMPTS:
+                        deadline = time.monotonic() + RETRY_DELAY_SECONDS
+                        continue
+                    # A batch that keeps failing must not hold up the records queued behind it
+                    self._salvage(conn, frames)
+                frames, rows, deadline, attempts = [], 0, None, 0
+                for waiter in waiters:
+                    waiter.set()
+                waiters = []
+        finally:
+            conn.close()
+
+    # Write the submissions of a failed batch one by one and quarantine those that still fail
+    def _salvage(self, conn, frames):
+        for frame in frames:
+            if not self._commit(conn, [frame], len(frame)):
+                self._quarantine(frame)
+
+    def _quarantine(self, frame):
+        logger.error('Dropping %d history records the database keeps refusing, saved to %s', len(frame), self.quarantine_path)
+        try:
+            frame.reindex(columns=HISTORY_COLUMNS).to_csv(self.quarantine_path, mode='a', header=not os.path.exists(self.quarantine_path), index=False)
+        except OSError:
+            logger.exception('Could not save the dropped history records')
+        with self._lock:
+            self._pending -= len(frame)
+            self._quarantined += len(frame)
+
+    def _commit(self, conn, frames, rows):
+        batch = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        start = time.perf_counter()
+        try:
+            with metrics.timed('history_write'):
+                append_records(batch, conn)
+        except Exception:
+            logger.exception('Could not write %d history records', rows)
+            with self._lock:
+                self._errors += 1
+            return False
+        self.flush_latency.record(time.perf_counter() - start)
+        metrics.count('history_rows', rows)
+        with self._lock:
+            self._pending -= rows
+            self._batches += 1
+            self._rows_written += rows
+        for callback in list(self._listeners):
+            try:
+                callback(batch)
+            except Exception:
+                logger.exception('History listener failed')
+        return True
+
+
+# One writer per process, shared by all sessions and flushed when the server exits
+@st.cache_resource(show_spinner=False)
+def get_history_writer():
+    writer = HistoryWriter()
+    atexit.register(writer.close)
+    return writer
@@ -0,0 +1,302 @@
+import fcntl
+import glob
+import itertools
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+import joblib
+import pandas as pd
+import streamlit as st
+from utils import metrics
+from utils.bulk import CHUNK_SIZE, PREVIEW_ROWS, iter_scored_chunks, open_upload
+from utils.model_registry import MODELS_DIR, get_registry
+from utils.prediction_cache import get_prediction_cache
+from utils.preprocess import BulkPreprocessor
+
+logger = logging.getLogger(__name__)
+
+# One folder per bulk-scoring job: the upload, status.json and the scored chunk parts
+JOBS_DIR = 'Data/jobs'
+
+ENCODER_PATH = './Models/label_encoder.joblib'
+
+# Jobs scored at the same time; each job can still use several worker processes
+JOB_THREADS = 1
+
+# Job lifecycle: queued -> running -> finished | failed | cancelled
+ACTIVE_STATES = ('queued', 'running')
+
+# How often the page refreshes the job list while a job is active
+JOB_POLL_SECONDS = 2
+
+# Serialises read-modify-write of status files between the page and the job threads
+_status_lock = threading.Lock()
+
+
+def job_dir(job_id, jobs_dir=JOBS_DIR):
+    return os.path.join(jobs_dir, job_id)
+
+
+# Write a file through a temporary name, so readers and resumed jobs never see half of it
+def _write_atomic(path, write):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_status(job_id, jobs_dir=JOBS_DIR):
+    with open(os.path.join(job_dir(job_id, jobs_dir), 'status.json'), encoding='utf-8') as file:
+        return json.load(file)
+
+
+# Merge changes into a job's status file and return the new status
+def update_status(job_id, jobs_dir=JOBS_DIR, **changes):
+    path = os.path.join(job_dir(job_id, jobs_dir), 'status.json')
+    with _status_lock:
+        status = read_status(job_id, jobs_dir) if os.path.exists(path) else {}
+        status.update(changes, updated=time.time())
+
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(status, file, indent=2)
+        _write_atomic(path, write)
+    return status
+
+
+def read_bytes(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+# Cross-process lease on a job: an exclusive lock on its lock file, held while the job runs.
+# The lock goes with the process holding it, so the lease of a crashed server is free again.
+# Returns the open lock file descriptor, or None if another queue holds the lease.
+def _try_lease(job_id, jobs_dir=JOBS_DIR):
+    try:
+        fd = os.open(os.path.join(job_dir(job_id, jobs_dir), 'lock'), os.O_RDWR | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        return None  # Deleted
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+# Scored rows and rejected values of one chunk, numbered so they concatenate in input order
+def part_paths(job_id, chunk_number, jobs_dir=JOBS_DIR):
+    folder = os.path.join(job_dir(job_id, jobs_dir), 'parts')
+    return os.path.join(folder, f'part-{chunk_number:05d}.csv'), os.path.join(folder, f'part-{chunk_number:05d}_errors.csv')
+
+
+# Statuses of all jobs, newest first, optionally only those of one user
+def list_jobs(owner=None, jobs_dir=JOBS_DIR):
+    jobs = []
+    for path in glob.glob(os.path.join(jobs_dir, '*', 'status.json')):
+        try:
+            with open(path, encoding='utf-8') as file:
+                status = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if owner is None or status.get('owner') == owner:
+            jobs.append(status)
+    return sorted(jobs, key=lambda status: status['created'], reverse=True)
+
+
+# The first scored rows of a finished job
+def job_preview(status, rows=PREVIEW_ROWS):
+    if not status.get('result_path') or not os.path.exists(status['result_path']):
+        return pd.DataFrame()
+    return pd.read_csv(status['result_path'], nrows=rows)
+
+
+# Everything a job needs to rebuild the scoring stack on its own
+def _scoring_stack(status):
+    registry = get_registry()
+    info = registry.info(status['model'])
+    pipeline = registry.get(status['model'], status['engine'])
+    encoder = joblib.load(ENCODER_PATH)
+    explainer = explanation_cache = None
+    if status['top_k']:
+        from utils.explain import TreeExplainer, get_explanation_cache
+        explainer = TreeExplainer(registry.get(status['model'], 'compiled'))
+        explanation_cache = get_explanation_cache()
+    return info, BulkPreprocessor(info['feature_schema']), pipeline, encoder, explainer, explanation_cache
+
+
+# Background queue of bulk-scoring jobs. Each chunk is written to its own part
+# file before the job's status records it as done, so a job interrupted by a
+# crash or restart resumes after its last finished chunk.
+class JobQueue:
+    def __init__(self, jobs_dir=JOBS_DIR, n_threads=JOB_THREADS):
+        self.jobs_dir = jobs_dir
+        self._queue = queue.Queue()
+        # A job can be queued twice (e.g. resumed while its old entry waits), but never runs twice at once
+        self._running = set()
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, name=f'bulk-job-{i}', daemon=True) for i in range(n_threads)]
+        for thread in self._threads:
+            thread.start()
+        # Jobs left queued or running by a server process that stopped pick up where they stopped;
+        # jobs whose lease is held are being run by another replica
+        for status in sorted(list_jobs(jobs_dir=jobs_dir), key=lambda status: status['created']):
+            if status['state'] in ACTIVE_STATES:
+                lease = _try_lease(status['id'], jobs_dir)
+                if lease is not None:
+                    os.close(lease)
+                    self._queue.put(status['id'])
+
+    # Save an upload and queue it for scoring, returns the job id
+    def submit(self, uploaded_file, model, engine='sklearn', chunk_size=CHUNK_SIZE, top_k=0, n_workers=1, owner=None):
+        job_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        folder = job_dir(job_id, self.jobs_dir)
+        os.makedirs(os.path.join(folder, 'parts'), exist_ok=True)
+        extension = uploaded_file.name.split('.')[-1].lower()
+        input_path = os.path.join(folder, f'input.{extension}')
+
+        def write(tmp_path):
+            uploaded_file.seek(0)
+            with open(tmp_path, 'wb') as file:
+                shutil.copyfileobj(uploaded_file, file)
+        _write_atomic(input_path, write)
+
+        update_status(job_id, self.jobs_dir, id=job_id, owner=owner, name=uploaded_file.name, input_path=input_path,
+                      model=model, engine=engine, chunk_size=int(chunk_size), top_k=int(top_k), n_workers=int(n_workers),
+                      state='queued', cancel_requested=False, created=time.time(), total_rows=None, rows_done=0,
+                      chunks_done=0, scored=0, rejected=0, error=None, result_path=None, errors_path=None)
+        self._queue.put(job_id)
+        return job_id
+
+    # Ask a job to stop; a running job stops after its current chunk
+    def cancel(self, job_id):
+        status = read_status(job_id, self.jobs_dir)
+        if status['state'] == 'queued':
+            return update_status(job_id, self.jobs_dir, state='cancelled', cancel_requested=True)
+        if status['state'] == 'running':
+            return update_status(job_id, self.jobs_dir, cancel_requested=True)
+        return status
+
+    # Queue a cancelled or failed job again, it continues after its last finished chunk
+    def resume(self, job_id):
+        status = read_status(job_id, self.jobs_dir)
+        if status['state'] in ('cancelled', 'failed'):
+            status = update_status(job_id, self.jobs_dir, state='queued', cancel_requested=False, error=None)
+            self._queue.put(job_id)
+        return status
+
+    def delete(self, job_id):
+        if read_status(job_id, self.jobs_dir)['state'] not in ACTIVE_STATES:
+            shutil.rmtree(job_dir(job_id, self.jobs_dir), ignore_errors=True)
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            with self._lock:
+                if job_id in self._running:
+                    continue
+                self._running.add(job_id)
+            # Skipped while another process, or another queue of this one, holds the job's lease
+            lease = _try_lease(job_id, self.jobs_dir)
+            try:
+                if lease is not None:
+                    self._process(job_id)
+            except Exception as e:
+                logger.exception('Bulk job %s failed', job_id)
+                if os.path.exists(job_dir(job_id, self.jobs_dir)):
+                    update_status(job_id, self.jobs_dir, state='failed', error=str(e))
+            finally:
+                if lease is not None:
+                    os.close(lease)
+                with self._lock:
+                    self._running.discard(job_id)
+
+    def _process(self, job_id):
+        if not os.path.exists(job_dir(job_id, self.jobs_dir)):
+            return  # Deleted while queued
+        status = read_status(job_id, self.jobs_dir)
+        if status['state'] not in ACTIVE_STATES or status['cancel_requested']:
+            return
+        status = update_status(job_id, self.jobs_dir, state='running')
+
+        info, preprocessor, pipeline, encoder, explainer, explanation_cache = _scoring_stack(status)
+        chunks_done, rows_done = status['chunks_done'], status['rows_done']
+
+        with open(status['input_path'], 'rb') as upload:
+            total_rows, chunks = open_upload(upload, chunk_size=status['chunk_size'])
+            if status['total_rows'] is None:
+                status = update_status(job_id, self.jobs_dir, total_rows=total_rows)
+            # Chunks finished before an interruption are read past, not scored again
+            chunks = itertools.islice(chunks, chunks_done, None)
+            if status['n_workers'] > 1:
+                from utils.parallel import iter_scored_chunks_parallel, model_spec
+                spec = model_spec(os.path.join(MODELS_DIR, info['file']), ENCODER_PATH, info['feature_schema'],
+                                  status['engine'], info['version'], status['top_k'])
+                scored_chunks = iter_scored_chunks_parallel(chunks, spec, n_workers=status['n_workers'], row_offset=rows_done)
+            else:
+                scored_chunks = iter_scored_chunks(chunks, preprocessor, pipeline, encoder, get_prediction_cache(), info['version'],
+                                                   explainer, explanation_cache, status['top_k'], row_offset=rows_done)
+
+            labels = dict(model=status['model'], engine=status['engine'], workers=status['n_workers'])
+            while True:
+                # Chunks are read, preprocessed and scored when the generator is advanced
+                with metrics.timed('bulk_score', **labels):
+                    item = next(scored_chunks, None)
+                if item is None:
+                    break
+                chunk_rows, scored, errors = item
+                with metrics.timed('bulk_job_write', model=status['model']):
+                    scored_path, errors_path = part_paths(job_id, chunks_done, self.jobs_dir)
+                    if scored is not None:
+                        _write_atomic(scored_path, lambda tmp_path: scored.to_csv(tmp_path, index=False))
+                    if len(errors):
+                        _write_atomic(errors_path, lambda tmp_path: errors.to_csv(tmp_path, index=False))
+                chunks_done += 1
+                rows_done += chunk_rows
+                status = update_status(job_id, self.jobs_dir, chunks_done=chunks_done, rows_done=rows_done,
+                                       scored=status['scored'] + (len(scored) if scored is not None else 0),
+                                       rejected=status['rejected'] + (errors['row'].nunique() if len(errors) else 0))
+                metrics.count('bulk_rows', len(scored) if scored is not None else 0, model=status['model'])
+                # The status is re-read on every update, so a cancel from the page is seen after this chunk
+                if status['cancel_requested']:
+                    scored_chunks.close()
+                    update_status(job_id, self.jobs_dir, state='cancelled')
+                    return
+
+        result_path, errors_path = self._combine(job_id, chunks_done)
+        update_status(job_id, self.jobs_dir, state='finished', total_rows=rows_done, result_path=result_path, errors_path=errors_path)
+        # The combined files hold everything now; a finished job is never resumed
+        shutil.rmtree(os.path.join(job_dir(job_id, self.jobs_dir), 'parts'), ignore_errors=True)
+
+    # Concatenate the part files into the downloadable results and error report
+    def _combine(self, job_id, n_chunks):
+        folder = job_dir(job_id, self.jobs_dir)
+        outputs = []
+        for kind, index in (('predictions', 0), ('errors', 1)):
+            parts = [path for path in (part_paths(job_id, i, self.jobs_dir)[index] for i in range(n_chunks)) if os.path.exists(path)]
+            if not parts:
+                outputs.append(None)
+                continue
+            path = os.path.join(folder, f'{kind}.csv')
+
+            def write(tmp_path):
+                with open(tmp_path, 'wb') as combined:
+                    for i, part in enumerate(parts):
+                        with open(part, 'rb') as file:
+                            if i:
+                                file.readline()  # Only the first part keeps its header
+                            shutil.copyfileobj(file, combined)
+            _write_atomic(path, write)
+            outputs.append(path)
+        return tuple(outputs)
+
+
+# Job queue shared by every session, started with the first page that uses it
+@st.cache_resource(show_spinner=False)
+def get_job_queue():
+    return JobQueue()
@@ -0,0 +1,230 @@
+# Process-wide timers, counters and latency histograms for the hot paths.
+# Collection is off unless one of these environment variables is set:
+#   CHURN_METRICS=1          collect, read them with snapshot() / prometheus_text()
+#   CHURN_METRICS_PORT=9464  also serve /metrics (Prometheus text) and /metrics.json locally
+#   CHURN_METRICS_FILE=path  also export every CHURN_METRICS_INTERVAL seconds (default 15):
+#                            a .prom file is replaced atomically, other files get JSON lines appended
+# When it is off, timed() hands out one shared no-op context manager and count() returns at once.
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import parent_process
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+EXPORT_INTERVAL_SECONDS = 15.0
+
+METRIC_PREFIX = 'churn_app'
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.bucket_counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, operation, seconds, labels):
+        key = (operation, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, value, labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # Plain-dict copy of every metric, safe to serialise
+    def snapshot(self):
+        with self._lock:
+            histograms = [
+                {'operation': operation, 'labels': dict(labels), 'count': hist.count, 'sum_seconds': hist.sum,
+                 'buckets': dict(zip([str(bound) for bound in BUCKETS], hist.bucket_counts))}
+                for (operation, labels), hist in self._histograms.items()
+            ]
+            counters = [{'name': name, 'labels': dict(labels), 'value': value} for (name, labels), value in self._counters.items()]
+        return {'timestamp': time.time(), 'histograms': histograms, 'counters': counters}
+
+    # Prometheus text exposition format
+    def prometheus_text(self):
+        with self._lock:
+            histograms = sorted((key, list(hist.bucket_counts), hist.count, hist.sum) for key, hist in self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = []
+        if histograms:
+            name = f'{METRIC_PREFIX}_operation_seconds'
+            lines += [f'# HELP {name} Latency of instrumented operations.', f'# TYPE {name} histogram']
+            for (operation, labels), bucket_counts, count, total in histograms:
+                key = (('operation', operation),) + labels
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS, bucket_counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{_format_labels(key, [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(key)} {total}')
+                lines.append(f'{name}_count{_format_labels(key)} {count}')
+        for counter in sorted({name for (name, _), _ in counters}):
+            metric = f'{METRIC_PREFIX}_{counter}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines += [f'{metric}{_format_labels(labels)} {value}' for (name, labels), value in counters if name == counter]
+        return '\n'.join(lines) + '\n'
+
+
+class _Timer:
+    __slots__ = ('operation', 'labels', 'start')
+
+    def __init__(self, operation, labels):
+        self.operation = operation
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        labels = self.labels if exc_type is None else dict(self.labels, status='error')
+        registry.observe(self.operation, time.perf_counter() - self.start, labels)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+registry = MetricsRegistry()
+
+enabled = False
+
+
+# Time a block: `with timed('make_prediction', model=name): ...`
+def timed(operation, **labels):
+    if not enabled:
+        return _NOOP_TIMER
+    return _Timer(operation, labels)
+
+
+# Add to a counter: `count('predictions', len(df), model=name)`
+def count(name, value=1, **labels):
+    if enabled:
+        registry.increment(name, value, labels)
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+def prometheus_text():
+    return registry.prometheus_text()
+
+
+# Write the current metrics to a file: Prometheus text replaced atomically for .prom, else one appended JSON line
+def export_to_file(path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    if path.endswith('.prom'):
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            file.write(prometheus_text())
+        os.replace(tmp_path, path)
+    else:
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(snapshot()) + '\n')
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = prometheus_text().encode(), 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body, content_type = json.dumps(snapshot()).encode(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve the metrics on a local port from a daemon thread
+def start_http_exporter(port, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+# Export to a file every `interval` seconds, and once more when the process exits
+def start_file_exporter(path, interval=EXPORT_INTERVAL_SECONDS):
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            export_to_file(path)
+
+    threading.Thread(target=run, name='metrics-file', daemon=True).start()
+    atexit.register(lambda: (stop.set(), export_to_file(path)))
+    return stop
+
+
+def configure_from_env():
+    global enabled
+    port = os.environ.get('CHURN_METRICS_PORT')
+    path = os.environ.get('CHURN_METRICS_FILE')
+    # Worker processes of the bulk scorer collect nothing and must not bind the port again
+    enabled = bool(port or path or os.environ.get('CHURN_METRICS', '').lower() in ('1', 'true', 'yes')) and parent_process() is None
+    if not enabled:
+        return
+    if port:
+        start_http_exporter(int(port))
+    if path:
+        start_file_exporter(path, float(os.environ.get('CHURN_METRICS_INTERVAL', EXPORT_INTERVAL_SECONDS)))
+
+
+configure_from_env()
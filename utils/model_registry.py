@@ -0,0 +1,224 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+import joblib
+import pandas as pd
+import streamlit as st
+from utils import metrics
+
+# Folder holding the model files and the manifest describing them
+MODELS_DIR = 'Models'
+MANIFEST_PATH = os.path.join(MODELS_DIR, 'manifest.json')
+
+# Maximum number of models kept in memory at the same time
+MAX_RESIDENT_MODELS = 2
+
+# Inference engines: sklearn's own predict_proba, or the compiled tree evaluator
+ENGINES = ('sklearn', 'compiled')
+
+
+# Feature schema of a fitted pipeline: numeric columns, categorical columns with
+# their known categories, and the remaining input columns
+def describe_pipeline(pipeline):
+    schema = {'columns': [str(col) for col in getattr(pipeline, 'feature_names_in_', [])], 'numeric': [], 'categorical': {}}
+    preprocessor = pipeline.named_steps.get('preprocessor') if hasattr(pipeline, 'named_steps') else None
+    for name, transformer, columns in getattr(preprocessor, 'transformers_', []):
+        if transformer == 'drop' or name == 'remainder':
+            continue
+        columns = [str(col) for col in columns]
+        encoder = transformer.steps[-1][1] if hasattr(transformer, 'steps') else transformer
+        if hasattr(encoder, 'categories_'):
+            for col, categories in zip(columns, encoder.categories_):
+                schema['categorical'][col] = [str(c) for c in categories if c is not None and c == c]
+        else:
+            schema['numeric'].extend(columns)
+    return schema
+
+
+# Small batch matching a feature schema, used to warm a model up after loading
+def dummy_batch(schema, rows=2):
+    data = {}
+    for col in schema['columns']:
+        if col in schema['categorical'] and schema['categorical'][col]:
+            data[col] = [schema['categorical'][col][0]] * rows
+        else:
+            data[col] = [0.0] * rows
+    return pd.DataFrame(data)
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Folder next to a model file holding the compiled, memory-mappable tree arrays of one version of it.
+# Every version gets its own folder, so a new version is published without touching one being read.
+def compiled_artifact_path(model_path, version):
+    return f'{os.path.splitext(model_path)[0]}.{version}.compiled'
+
+
+# Artifact folder of a version if it is complete and still there, else None
+def _load_artifact(folder, version):
+    from utils.tree_compiler import CompiledPipeline
+    try:
+        if CompiledPipeline.saved_version(folder) == version:
+            return CompiledPipeline.load(folder)
+    except (OSError, ValueError):
+        pass  # Removed or replaced by another process while loading
+    return None
+
+
+# Compiled pipeline of a model file, memory-mapped from its artifact folder so that every
+# process serving the model shares one copy of the tree arrays. The folder is written from
+# the joblib file when it is missing; if it cannot be written or read, the pipeline compiled
+# in memory is used instead.
+def load_compiled(model_path, version=None):
+    from utils.tree_compiler import CompiledPipeline
+    if version is None:
+        return CompiledPipeline(joblib.load(model_path))
+    folder = compiled_artifact_path(model_path, version)
+    pipeline = _load_artifact(folder, version)
+    if pipeline is not None:
+        return pipeline
+
+    pipeline = CompiledPipeline(joblib.load(model_path))
+    try:
+        pipeline.save(folder, version)
+    except OSError:
+        pass  # Read-only models folder, or another process published the folder first
+    else:
+        # Folders of older versions; processes still mapping them keep their pages until they unmap
+        for old_folder in glob.glob(f'{glob.escape(os.path.splitext(model_path)[0])}.*.compiled'):
+            if old_folder != folder:
+                shutil.rmtree(old_folder, ignore_errors=True)
+    return _load_artifact(folder, version) or pipeline
+
+
+# Load every model listed in the manifest and record its version, schema, size and load time
+def build_manifest(models, manifest_path=MANIFEST_PATH):
+    models_dir = os.path.dirname(manifest_path)
+    manifest = {'models': {}}
+    for name, file_name in models.items():
+        path = os.path.join(models_dir, file_name)
+        start = time.perf_counter()
+        pipeline = joblib.load(path)
+        load_seconds = time.perf_counter() - start
+        manifest['models'][name] = {
+            'file': file_name,
+            'version': file_sha256(path)[:12],
+            'size_bytes': os.path.getsize(path),
+            'load_seconds': round(load_seconds, 4),
+            'feature_schema': describe_pipeline(pipeline),
+        }
+        # Compile gradient boosting models here, so serving processes only map the arrays
+        try:
+            load_compiled(path, manifest['models'][name]['version'])
+        except (AttributeError, ValueError):
+            pass  # Not a model the tree compiler supports
+    with open(manifest_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+# Display name of a model loaded with a given engine
+def key_name(name, engine):
+    return name if engine == 'sklearn' else f'{name} ({engine})'
+
+
+# Lazily loaded models, warmed up on first load and evicted least recently used first
+class ModelRegistry:
+    def __init__(self, manifest_path=MANIFEST_PATH, max_resident=MAX_RESIDENT_MODELS):
+        self.manifest_path = manifest_path
+        self.models_dir = os.path.dirname(manifest_path)
+        self.max_resident = max_resident
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            self.manifest = json.load(file)['models']
+        self.load_seconds = {}
+        self._resident = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.manifest}
+
+    # Names of the models whose files are present
+    def available(self):
+        return [name for name, entry in self.manifest.items()
+                if os.path.exists(os.path.join(self.models_dir, entry['file']))]
+
+    def info(self, name):
+        return self.manifest[name]
+
+    def resident(self):
+        with self._lock:
+            return [key_name(name, engine) for name, engine in self._resident]
+
+    def get(self, name, engine='sklearn'):
+        key = (name, engine)
+        with self._lock:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+                return self._resident[key]
+        if name not in self.manifest:
+            raise KeyError(f"Model '{name}' is not listed in {self.manifest_path}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+
+        # One loader per model, so concurrent first requests share a single load
+        with self._load_locks[name]:
+            with self._lock:
+                if key in self._resident:
+                    self._resident.move_to_end(key)
+                    return self._resident[key]
+            pipeline = self._load(name, engine)
+            with self._lock:
+                self._resident[key] = pipeline
+                while len(self._resident) > self.max_resident:
+                    self._resident.popitem(last=False)
+            return pipeline
+
+    def _load(self, name, engine):
+        entry = self.manifest[name]
+        start = time.perf_counter()
+        with metrics.timed('model_load', model=key_name(name, engine)):
+            path = os.path.join(self.models_dir, entry['file'])
+            pipeline = load_compiled(path, entry['version']) if engine == 'compiled' else joblib.load(path)
+            # The first call pays for lazy initialisation inside sklearn, do it before serving
+            pipeline.predict_proba(dummy_batch(entry['feature_schema']))
+        self.load_seconds[key_name(name, engine)] = time.perf_counter() - start
+        return pipeline
+
+    # Load models in a background thread so the first prediction does not wait for them
+    def preload(self, names=None):
+        names = list(names or self.available())[:self.max_resident]
+        thread = threading.Thread(target=lambda: [self.get(name) for name in names], name='model-preload', daemon=True)
+        thread.start()
+        return thread
+
+
+# Registry shared by every session of the app, preloading the models on creation
+@st.cache_resource(show_spinner=False)
+def get_registry():
+    registry = ModelRegistry()
+    registry.preload()
+    return registry
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild Models/manifest.json')
+    parser.add_argument('--add', nargs=2, action='append', default=[], metavar=('NAME', 'FILE'),
+                        help='Add a model file from the Models folder under a display name')
+    args = parser.parse_args()
+
+    models = {}
+    if os.path.exists(MANIFEST_PATH):
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as file:
+            models = {name: entry['file'] for name, entry in json.load(file)['models'].items()}
+    models.update(dict(args.add))
+    print(json.dumps(build_manifest(models), indent=2))
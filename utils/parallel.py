@@ -0,0 +1,68 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import joblib
+from utils.bulk import score_chunk
+from utils.model_registry import load_compiled
+from utils.prediction_cache import PredictionCache
+from utils.preprocess import BulkPreprocessor
+
+# Model, encoder and preprocessor of the current worker process, loaded once by _init_worker
+_worker = {}
+
+
+# Everything a worker needs to rebuild the scoring stack on its own
+# explain_top_k > 0 adds that many driver columns to every scored row
+def model_spec(model_path, encoder_path, feature_schema, engine='sklearn', model_version=None, explain_top_k=0):
+    return {'model_path': model_path, 'encoder_path': encoder_path, 'feature_schema': feature_schema,
+            'engine': engine, 'model_version': model_version, 'explain_top_k': explain_top_k}
+
+
+def _init_worker(spec):
+    # Compiled tree arrays are memory-mapped from the model's artifact folder, shared by all
+    # workers; numeric arrays of uncompressed joblib files are memory-mapped as well
+    if spec['engine'] == 'compiled':
+        pipeline = load_compiled(spec['model_path'], spec['model_version'])
+    else:
+        pipeline = joblib.load(spec['model_path'], mmap_mode='r')
+    _worker['pipeline'] = pipeline
+    _worker['encoder'] = joblib.load(spec['encoder_path'])
+    _worker['preprocessor'] = BulkPreprocessor(spec['feature_schema'])
+    # Each worker keeps its own cache, collapsing duplicates within and across its shards
+    _worker['cache'] = PredictionCache()
+    _worker['model_version'] = spec['model_version']
+    _worker['explainer'] = None
+    _worker['top_k'] = spec.get('explain_top_k', 0)
+    if _worker['top_k']:
+        from utils.explain import TreeExplainer
+        compiled = pipeline if spec['engine'] == 'compiled' else load_compiled(spec['model_path'], spec['model_version'])
+        _worker['explainer'] = TreeExplainer(compiled)
+        _worker['explanation_cache'] = PredictionCache()
+
+
+def _score_shard(shard, row_offset):
+    features, ids, errors = _worker['preprocessor'].transform(shard, row_offset=row_offset)
+    scored = score_chunk(features, ids, _worker['pipeline'], _worker['encoder'], _worker['cache'], _worker['model_version'],
+                         _worker['explainer'], _worker.get('explanation_cache'), _worker['top_k']) if len(features) else None
+    return len(shard), scored, errors
+
+
+# Score chunks in a pool of worker processes. Yields (rows read, scored rows,
+# rejected values) per chunk in the original order, like utils.bulk.iter_scored_chunks.
+# At most max_in_flight chunks are queued at once so memory stays bounded.
+def iter_scored_chunks_parallel(chunks, spec, n_workers=None, max_in_flight=None, row_offset=0):
+    n_workers = n_workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 2 * n_workers
+    pending = deque()
+    rows_submitted = row_offset
+
+    # spawn keeps workers independent of the Streamlit server's threads
+    with ProcessPoolExecutor(n_workers, mp_context=get_context('spawn'), initializer=_init_worker, initargs=(spec,)) as executor:
+        for chunk in chunks:
+            pending.append(executor.submit(_score_shard, chunk, rows_submitted))
+            rows_submitted += len(chunk)
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,74 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+# Above this many rows the scatter plot switches to WebGL traces
+WEBGL_THRESHOLD = 5_000
+
+# Maximum number of points sent to the browser for a scatter plot
+MAX_SCATTER_POINTS = 20_000
+
+
+# Downsample rows while keeping the proportions of each class in `by`
+def stratified_sample(df, by, max_rows, random_state=42):
+    if len(df) <= max_rows:
+        return df
+    fraction = max_rows / len(df)
+    return df.groupby(by, observed=True, group_keys=False).sample(frac=fraction, random_state=random_state)
+
+
+# Scatter plot that stays light in the browser for large inputs
+def scatter_figure(df, x, y, color, title):
+    df = df[[x, y, color]]
+    if len(df) <= WEBGL_THRESHOLD:
+        fig = px.scatter(df, x=x, y=y, color=color, title=title)
+        fig.update_traces(marker=dict(size=10, opacity=0.8, line=dict(width=2, color='DarkSlateGrey')))
+        return fig
+
+    sample = stratified_sample(df, color, MAX_SCATTER_POINTS)
+    fig = px.scatter(sample, x=x, y=y, color=color, title=f'{title} ({len(sample):,} of {len(df):,} points)', render_mode='webgl')
+    # Per-marker outlines are expensive to draw for many points
+    fig.update_traces(marker=dict(size=5, opacity=0.6, line=dict(width=0)))
+    return fig
+
+
+# Box plot statistics (quartiles and 1.5 IQR whiskers) of an array
+def box_stats(values):
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    lower = values[values >= q1 - 1.5 * iqr].min()
+    upper = values[values <= q3 + 1.5 * iqr].max()
+    return {'q1': [q1], 'median': [median], 'q3': [q3], 'lowerfence': [lower], 'upperfence': [upper]}
+
+
+# Histogram with a box marginal, binned on the server so only the bin counts
+# and box statistics are sent to the browser
+def histogram_figure(df, x, color, nbins, title):
+    values = df[x].to_numpy(dtype=float)
+    classes = df[color].to_numpy()
+    valid = ~np.isnan(values)
+    values, classes = values[valid], classes[valid]
+
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+    if len(values) == 0:
+        fig.update_layout(title=title)
+        return fig
+
+    edges = np.histogram_bin_edges(values, bins=nbins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    palette = px.colors.qualitative.Plotly
+
+    for i, label in enumerate(sorted(set(classes.tolist()), key=str)):
+        class_values = values[classes == label]
+        counts, _ = np.histogram(class_values, bins=edges)
+        trace_color = palette[i % len(palette)]
+        fig.add_trace(go.Box(y=[str(label)], orientation='h', name=str(label), legendgroup=str(label), showlegend=False,
+                             marker_color=trace_color, **box_stats(class_values)), row=1, col=1)
+        fig.add_trace(go.Bar(x=centers, y=counts, width=np.diff(edges), name=str(label), legendgroup=str(label),
+                             marker_color=trace_color), row=2, col=1)
+
+    fig.update_layout(title=title, barmode='relative', legend_title_text=color, bargap=0)
+    fig.update_xaxes(title_text=x, row=2, col=1)
+    fig.update_yaxes(title_text='count', row=2, col=1)
+    return fig
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.scoring import FEATURE_COLUMNS, NUMERIC_FEATURES, score_batch
+
+# Bounds of the shared prediction cache
+CACHE_MAX_ENTRIES = 200_000
+CACHE_TTL_SECONDS = 24 * 3600
+
+
+# Hash of every feature row after normalising dtypes, so the same customer hashes
+# the same whether it came from the form, a CSV or a spreadsheet
+def row_hashes(df):
+    normalized = pd.DataFrame({
+        col: df[col].astype('float64') if col in NUMERIC_FEATURES else df[col].astype(object).where(df[col].notna(), None).astype(str)
+        for col in FEATURE_COLUMNS
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+# Bounded LRU cache of result tuples, e.g. (label, probability), keyed by
+# (model version, row hash), with entries expiring after ttl_seconds
+class PredictionCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    found.append(entry[1:])
+                    self.hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    found.append(None)
+                    self.misses += 1
+        return found
+
+    # One sequence per result field, e.g. put_many(keys, labels, probabilities)
+    def put_many(self, keys, *values):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, *entry in zip(keys, *values):
+                self._entries[key] = (expires_at, *entry)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+# Score a batch through the cache. Duplicate rows are collapsed first, only rows
+# not in the cache go through the model, and results are spread back to every copy.
+# Returns the labels and the probability of the predicted class (in %), like score_batch.
+def score_with_cache(pipeline, encoder, df, cache, model_version):
+    hashes = row_hashes(df)
+    unique_hashes, first_rows, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    keys = [(model_version, int(h)) for h in unique_hashes]
+
+    cached = cache.get_many(keys)
+    labels = np.empty(len(keys), dtype=object)
+    probabilities = np.empty(len(keys))
+    missing = [i for i, entry in enumerate(cached) if entry is None]
+    for i, entry in enumerate(cached):
+        if entry is not None:
+            labels[i], probabilities[i] = entry
+
+    if missing:
+        new_labels, new_probabilities, _ = score_batch(pipeline, encoder, df.iloc[first_rows[missing]])
+        labels[missing] = new_labels
+        probabilities[missing] = new_probabilities
+        cache.put_many([keys[i] for i in missing], new_labels, new_probabilities)
+
+    return labels[inverse], probabilities[inverse]
+
+
+# Cache shared by every session of the app
+@st.cache_resource(show_spinner=False)
+def get_prediction_cache():
+    return PredictionCache()
@@ -0,0 +1,126 @@
+import math
+import re
+import numpy as np
+import pandas as pd
+
+# Identifier columns carried through to the results but never scored
+ID_COLUMNS = ['customerID']
+
+# Values read as missing rather than rejected
+BLANK_VALUES = {'', ' '}
+
+
+# Lower-case a header and drop everything but letters and digits,
+# so 'Total Charges', 'total_charges' and 'TotalCharges' all match
+def normalize_headers(columns):
+    return pd.Index(columns).astype(str).str.lower().str.replace(r'[^a-z0-9]', '', regex=True)
+
+
+def normalize_header(name):
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+# Validates and converts bulk upload chunks into model input, built once from
+# the feature schema of a model (see utils.model_registry.describe_pipeline)
+class BulkPreprocessor:
+    def __init__(self, feature_schema, id_columns=ID_COLUMNS):
+        self.columns = list(feature_schema['columns'])
+        self.numeric = list(feature_schema['numeric'])
+        self.categorical = {col: pd.CategoricalDtype(categories) for col, categories in feature_schema['categorical'].items()}
+        self.id_columns = list(id_columns)
+        known = self.columns + self.id_columns
+        self.header_map = dict(zip(normalize_headers(known), known))
+        self.category_sets = {col: set(dtype.categories) for col, dtype in self.categorical.items()}
+
+    # Rename recognised headers to their canonical names and drop the rest, in place
+    def _map_headers(self, df):
+        mapped = normalize_headers(df.columns).map(lambda name: self.header_map.get(name, f'__unused__{name}'))
+        collisions = {}
+        for header, col in zip(df.columns, mapped):
+            if not col.startswith('__unused__'):
+                collisions.setdefault(col, []).append(str(header))
+        collisions = {col: headers for col, headers in collisions.items() if len(headers) > 1}
+        if collisions:
+            details = '; '.join(f"{', '.join(repr(h) for h in headers)} all map to {col}" for col, headers in collisions.items())
+            raise ValueError(f"The file has columns that name the same field: {details}")
+        df.columns = mapped
+        for col in [col for col in df.columns if col.startswith('__unused__')]:
+            del df[col]
+        missing = [col for col in self.columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"The file is missing required columns: {', '.join(missing)}")
+
+    # Check one JSON-like record with the same rules as transform, without building a DataFrame.
+    # Returns (the record under canonical field names, one error record per rejected field).
+    def check_record(self, record):
+        canonical, errors = {}, []
+        for key, value in record.items():
+            col = self.header_map.get(normalize_header(key))
+            if col is None:
+                continue
+            if col in canonical:
+                errors.append({'column': col, 'value': str(key), 'reason': 'given more than once'})
+            canonical[col] = value
+
+        for col in self.columns:
+            if col not in canonical:
+                errors.append({'column': col, 'value': None, 'reason': 'missing'})
+                continue
+            value = canonical[col]
+            if value is None or (isinstance(value, str) and value in BLANK_VALUES):
+                continue
+            if col in self.numeric:
+                if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                    valid = False
+                else:
+                    try:
+                        valid = not (isinstance(value, str) and math.isnan(float(value)))
+                    except ValueError:
+                        valid = False
+                if not valid:
+                    errors.append({'column': col, 'value': str(value), 'reason': 'not a number'})
+            elif col in self.category_sets:
+                try:
+                    valid = value in self.category_sets[col]
+                except TypeError:  # Unhashable, e.g. a list
+                    valid = False
+                if not valid:
+                    errors.append({'column': col, 'value': str(value),
+                                   'reason': f"expected one of {', '.join(map(str, self.categorical[col].categories))}"})
+        return canonical, errors
+
+    # Convert a chunk in place; row_offset is the number of data rows before it. Returns (features, ids, errors): the model input of
+    # the valid rows, their ID columns, and one error record per rejected value.
+    def transform(self, df, row_offset=0):
+        self._map_headers(df)
+        # 1-based data row numbers in the uploaded file, as shown in the error report
+        row_numbers = np.arange(row_offset + 1, row_offset + len(df) + 1)
+        invalid = np.zeros(len(df), dtype=bool)
+        errors = []
+
+        for col in self.numeric:
+            raw = df[col]
+            blank = raw.isna() | raw.isin(BLANK_VALUES)
+            converted = pd.to_numeric(raw, errors='coerce')
+            bad = (converted.isna() & ~blank).to_numpy()
+            if bad.any():
+                errors.append(pd.DataFrame({'row': row_numbers[bad], 'column': col, 'value': raw[bad].astype(str).to_numpy(), 'reason': 'not a number'}))
+                invalid |= bad
+            df[col] = converted
+
+        for col, dtype in self.categorical.items():
+            raw = df[col]
+            converted = raw.astype(dtype)
+            bad = (converted.isna() & raw.notna()).to_numpy()
+            if bad.any():
+                errors.append(pd.DataFrame({'row': row_numbers[bad], 'column': col, 'value': raw[bad].astype(str).to_numpy(),
+                                            'reason': f"expected one of {', '.join(map(str, dtype.categories))}"}))
+                invalid |= bad
+            df[col] = converted
+
+        ids = df[[col for col in self.id_columns if col in df.columns]]
+        features = df[self.columns]
+        if invalid.any():
+            features, ids = features[~invalid], ids[~invalid]
+        error_report = pd.concat(errors, ignore_index=True) if errors else pd.DataFrame(columns=['row', 'column', 'value', 'reason'])
+        return features, ids, error_report
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+# Input features expected by the churn models, in training order
+FEATURE_COLUMNS = [
+    'gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure', 'PhoneService',
+    'MultipleLines', 'InternetService', 'OnlineSecurity', 'OnlineBackup',
+    'DeviceProtection', 'TechSupport', 'StreamingTV', 'StreamingMovies',
+    'Contract', 'PaperlessBilling', 'PaymentMethod', 'MonthlyCharges', 'TotalCharges',
+]
+NUMERIC_FEATURES = ['tenure', 'MonthlyCharges', 'TotalCharges']
+
+
+# Select the model features of a frame and coerce the numeric ones
+def prepare_frame(df):
+    df = df.reindex(columns=FEATURE_COLUMNS)
+    for col in NUMERIC_FEATURES:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+# Build a model input frame from a list of JSON-like records
+def records_to_frame(records):
+    return prepare_frame(pd.DataFrame.from_records(records))
+
+
+# Score a batch with a single predict_proba pass.
+# Returns the decoded labels, the probability of the predicted class (in %)
+# and the full probability matrix.
+def score_batch(pipeline, encoder, df):
+    proba = pipeline.predict_proba(df)
+    pred_idx = proba.argmax(axis=1)
+
+    # Same label predict() would return, without running the model again
+    pred = pipeline.classes_[pred_idx]
+    labels = encoder.inverse_transform(pred)
+    probability = proba[np.arange(len(proba)), pred_idx] * 100
+    return labels, probability, proba
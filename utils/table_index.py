@@ -0,0 +1,148 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.bitmap_index import load_bitmap_index
+from utils.data_loader import DATASET_PATH, dataset_version, load_dataset
+from utils.figure_cache import normalize_filters
+
+# Column holding the customer IDs that can be searched
+ID_COLUMN = 'customerID'
+
+# Filtered, searched and sorted row orders kept for paging through them
+VIEW_CACHE_ENTRIES = 16
+
+
+# Sort keys of a column and a mask of its missing values; categoricals sort by their category order
+def sort_keys(column):
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        codes = column.cat.codes.to_numpy()
+        return codes, codes < 0
+    if pd.api.types.is_bool_dtype(column.dtype):
+        return column.to_numpy(dtype=np.int8), np.zeros(len(column), dtype=bool)
+    if pd.api.types.is_numeric_dtype(column.dtype):
+        values = column.to_numpy(dtype=float)
+        return values, np.isnan(values)
+    values = column.astype(object)
+    missing = values.isna().to_numpy()
+    return values.where(~missing, '').astype(str).to_numpy(), missing
+
+
+# Server-side access to a large, shared DataFrame one page at a time.
+# Sorting uses a permutation built once per column, value filters the dashboard's
+# bitmap index, and the customerID search a sorted copy of the IDs, so a page is
+# read without copying or scanning the whole frame.
+class TableIndex:
+    def __init__(self, data, bitmap_index, id_column=ID_COLUMN):
+        self.data = data
+        self.bitmap_index = bitmap_index
+        self.n_rows = len(data)
+        self.dtype = np.int32 if self.n_rows < 2 ** 31 else np.int64
+        self._orders = {}
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+        # IDs as UTF-8 bytes in sorted order with their row positions, searched by prefix
+        self.id_column = id_column if id_column in data.columns else None
+        if self.id_column is not None:
+            ids = data[self.id_column].astype(str).str.encode('utf-8').to_numpy().astype('S')
+            self._id_order = np.argsort(ids, kind='stable').astype(self.dtype)
+            self._sorted_ids = ids[self._id_order]
+
+    # Ascending permutation of a column with missing values last, its inverse (rank of every
+    # row) and the number of non-missing rows; built on first use and kept for later pages
+    def sort_order(self, col):
+        with self._lock:
+            order = self._orders.get(col)
+        if order is not None:
+            return order
+        keys, missing = sort_keys(self.data[col])
+        present = np.flatnonzero(~missing)
+        ascending = np.concatenate([present[np.argsort(keys[present], kind='stable')], np.flatnonzero(missing)]).astype(self.dtype)
+        rank = np.empty(self.n_rows, dtype=self.dtype)
+        rank[ascending] = np.arange(self.n_rows, dtype=self.dtype)
+        order = (ascending, rank, len(present))
+        with self._lock:
+            self._orders[col] = order
+        return order
+
+    # Row positions whose ID starts with the query, in ID order
+    def search_ids(self, query):
+        prefix = query.encode('utf-8')
+        start = np.searchsorted(self._sorted_ids, prefix, side='left')
+        stop = np.searchsorted(self._sorted_ids, prefix + b'\xff', side='left')
+        return self._id_order[start:stop]
+
+    # Matching rows as (positions, non-missing count): in ascending order of sort_by, or in row order.
+    # None as positions means every row, in the order of the permutation itself.
+    def _view(self, filters, search, sort_by):
+        key = (normalize_filters(filters), search, sort_by)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                self._views.move_to_end(key)
+                return view
+
+        bitmap = self.bitmap_index.select(filters)
+        if search:
+            positions = self.search_ids(search)
+            if bitmap is not None:
+                positions = positions[np.unpackbits(bitmap, count=self.n_rows).view(bool)[positions]]
+        elif bitmap is not None:
+            positions = self.bitmap_index.positions(bitmap).astype(self.dtype)
+        else:
+            positions = None
+
+        if sort_by is None:
+            if positions is not None:
+                positions = np.sort(positions)
+            view = (positions, self.n_rows if positions is None else len(positions))
+        else:
+            ascending, rank, n_valid = self.sort_order(sort_by)
+            if positions is None:
+                view = (None, n_valid)
+            else:
+                ranks = np.sort(rank[positions])
+                view = (ascending[ranks], int(np.searchsorted(ranks, n_valid)))
+
+        with self._lock:
+            self._views[key] = view
+            while len(self._views) > VIEW_CACHE_ENTRIES:
+                self._views.popitem(last=False)
+        return view
+
+    # Number of rows matching the filters and the ID search
+    def count(self, filters=None, search='', sort_by=None):
+        search = (search or '').strip() if self.id_column is not None else ''
+        positions, _ = self._view(filters or {}, search, sort_by)
+        return self.n_rows if positions is None else len(positions)
+
+    # One page of the rows matching the filters and the ID search, sorted by a column.
+    # Returns (page DataFrame, number of matching rows); missing values sort last either way.
+    def query(self, filters=None, search='', sort_by=None, descending=False, page=0, page_size=50, columns=None):
+        search = (search or '').strip() if self.id_column is not None else ''
+        positions, n_valid = self._view(filters or {}, search, sort_by)
+        if sort_by is not None and positions is None:
+            positions = self.sort_order(sort_by)[0]
+        total = self.n_rows if positions is None else len(positions)
+
+        index = np.arange(page * page_size, min((page + 1) * page_size, total))
+        if sort_by is not None and descending:
+            index = np.where(index < n_valid, n_valid - 1 - index, index)
+        rows = index if positions is None else positions[index]
+
+        # Only the page is copied, never the whole frame
+        if columns is None:
+            return self.data.iloc[rows], total
+        return self.data.iloc[rows, self.data.columns.get_indexer(columns)], total
+
+
+# Index of one dataset version, built once and shared by all sessions
+@st.cache_resource(show_spinner='Indexing dataset...', max_entries=4)
+def _load_table_index(path, version):
+    return TableIndex(load_dataset(path), load_bitmap_index(path))
+
+
+def load_table_index(path=DATASET_PATH):
+    return _load_table_index(path, dataset_version(path))
@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from scipy.special import expit, softmax
+
+try:
+    import numba
+    from numba import njit, prange
+    # Kernels run from Streamlit script threads and bulk job threads. With TBB the interpreter
+    # hangs at exit once a kernel was launched off the main thread, so prefer OpenMP
+    # unless a threading layer was configured explicitly.
+    if 'NUMBA_THREADING_LAYER' not in os.environ and 'NUMBA_THREADING_LAYER_PRIORITY' not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ['omp', 'tbb', 'workqueue']
+except ImportError:  # numba is optional, the NumPy evaluator is used without it
+    njit = None
+
+# Rows evaluated at once by the NumPy evaluator, bounding the (rows x trees) index matrix
+EVAL_BLOCK_ROWS = 4096
+
+# Deepest trees that can be compiled: every tree is padded to a complete tree of this depth
+MAX_COMPILED_DEPTH = 12
+
+# Tree arrays of a compiled model, each saved as its own .npy file so it can be memory-mapped
+ARRAY_NAMES = ('feature', 'threshold', 'missing_left', 'value', 'classes')
+
+# Layout of the saved arrays; folders of another format are compiled again
+ARTIFACT_FORMAT = 2
+
+
+# Expected output of every node of an sklearn tree: the leaves' values averaged over the
+# training samples reaching the node. Gradient boosting only updates the leaf values
+# (the Newton step), so tree.value of an internal node is not a mean of its leaves.
+def _node_expectations(tree):
+    expected = tree.value[:, 0, 0].astype(np.float64)
+    weights = tree.weighted_n_node_samples
+    # Children are stored after their parent, so one backward pass sees them first
+    for node in range(tree.node_count - 1, -1, -1):
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left == -1:
+            continue
+        total = weights[left] + weights[right]
+        if total > 0:
+            expected[node] = (weights[left] * expected[left] + weights[right] * expected[right]) / total
+        else:
+            expected[node] = (expected[left] + expected[right]) / 2
+    return expected
+
+
+# Copy one sklearn tree into complete-binary-tree (heap) arrays: node h has
+# children 2h+1 and 2h+2. Leaves above the full depth are padded with nodes
+# that always go left and carry the leaf's value down to the last level.
+def _fill_heap(tree, depth, feature, threshold, missing_left, value):
+    n_internal = 2 ** depth - 1
+    expected = _node_expectations(tree)
+    stack = [(0, 0)]
+    while stack:
+        node, h = stack.pop()
+        value[h] = expected[node]
+        if tree.children_left[node] == -1:
+            if h < n_internal:
+                stack.append((node, 2 * h + 1))
+                stack.append((node, 2 * h + 2))
+            continue
+        feature[h] = tree.feature[node]
+        threshold[h] = tree.threshold[node]
+        missing = getattr(tree, 'missing_go_to_left', None)
+        missing_left[h] = bool(missing[node]) if missing is not None else False
+        stack.append((tree.children_left[node], 2 * h + 1))
+        stack.append((tree.children_right[node], 2 * h + 2))
+
+
+# Gradient boosting ensemble compiled into flat NumPy arrays, one heap-ordered row per tree:
+#   feature, threshold, missing_left  (trees, internal nodes)
+#   value                              (trees, all nodes); the last 2**depth entries are the leaves,
+#                                      internal nodes hold the expected output below them
+class CompiledGradientBoosting:
+    def __init__(self, feature, threshold, missing_left, value, depth, init_raw, learning_rate, classes):
+        self.feature = feature
+        self.threshold = threshold
+        self.missing_left = missing_left
+        self.value = value
+        self.depth = depth
+        self.init_raw = init_raw
+        self.learning_rate = learning_rate
+        self.classes_ = classes
+        self.n_outputs = len(init_raw)
+        self.n_trees = feature.shape[0]
+        self.n_internal = feature.shape[1]
+
+    @classmethod
+    def from_estimator(cls, model):
+        trees = [estimator.tree_ for estimator in model.estimators_.ravel()]
+        depth = max(max(tree.max_depth for tree in trees), 1)
+        if depth > MAX_COMPILED_DEPTH:
+            raise ValueError(f'Trees of depth {depth} are too deep to compile (max {MAX_COMPILED_DEPTH})')
+
+        n_internal = 2 ** depth - 1
+        feature = np.zeros((len(trees), n_internal), dtype=np.int32)
+        # Padding nodes compare against +inf and send missing values left, so they always go left
+        threshold = np.full((len(trees), n_internal), np.inf)
+        missing_left = np.ones((len(trees), n_internal), dtype=bool)
+        value = np.zeros((len(trees), 2 * n_internal + 1))
+        for i, tree in enumerate(trees):
+            _fill_heap(tree, depth, feature[i], threshold[i], missing_left[i], value[i])
+
+        init_raw = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0]
+        return cls(feature, threshold, missing_left, value, depth,
+                   np.asarray(init_raw, dtype=np.float64), float(model.learning_rate), model.classes_)
+
+    # Write the tree arrays as .npy files and the scalars as meta.json into a folder
+    def save(self, folder):
+        arrays = {'feature': self.feature, 'threshold': self.threshold, 'missing_left': self.missing_left,
+                  'value': self.value, 'classes': np.asarray(self.classes_)}
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(folder, f'{name}.npy'), np.ascontiguousarray(arrays[name]), allow_pickle=False)
+        meta = {'depth': self.depth, 'init_raw': self.init_raw.tolist(), 'learning_rate': self.learning_rate}
+        with open(os.path.join(folder, 'model.json'), 'w', encoding='utf-8') as file:
+            json.dump(meta, file, indent=2)
+
+    # Load a saved model. With mmap_mode='r' the arrays are mapped read-only instead of
+    # read into memory, so processes loading the same folder share their pages.
+    @classmethod
+    def load(cls, folder, mmap_mode='r'):
+        with open(os.path.join(folder, 'model.json'), encoding='utf-8') as file:
+            meta = json.load(file)
+        # Plain ndarray views of the maps, for numba
+        arrays = {name: np.asarray(np.load(os.path.join(folder, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False))
+                  for name in ARRAY_NAMES}
+        return cls(arrays['feature'], arrays['threshold'], arrays['missing_left'], arrays['value'], meta['depth'],
+                   np.asarray(meta['init_raw'], dtype=np.float64), meta['learning_rate'], arrays['classes'])
+
+    @property
+    def nbytes(self):
+        return self.feature.nbytes + self.threshold.nbytes + self.missing_left.nbytes + self.value.nbytes
+
+    # Heap index of the leaf reached in every tree by every row, shape (rows, trees)
+    def apply(self, X):
+        rows = np.arange(len(X))[:, None]
+        offsets = (np.arange(self.n_trees) * self.n_internal)[None, :]
+        feature, threshold, missing_left = self.feature.ravel(), self.threshold.ravel(), self.missing_left.ravel()
+        nodes = np.zeros((len(X), self.n_trees), dtype=np.intp)
+        for _ in range(self.depth):
+            flat = offsets + nodes
+            x = X[rows, feature[flat]]
+            go_right = ~((x <= threshold[flat]) | (np.isnan(x) & missing_left[flat]))
+            nodes = 2 * nodes + 1 + go_right
+        return nodes
+
+    # Sum of the leaf values over trees, shape (rows, outputs)
+    def _leaf_sum(self, X):
+        if _numba_leaf_sum is not None:
+            return _numba_leaf_sum(X, self.feature, self.threshold, self.missing_left, self.value,
+                                   self.depth, self.n_outputs)
+        summed = np.empty((len(X), self.n_outputs))
+        tree_index = np.arange(self.n_trees)[None, :]
+        for start in range(0, len(X), EVAL_BLOCK_ROWS):
+            block = X[start:start + EVAL_BLOCK_ROWS]
+            leaf_values = self.value[tree_index, self.apply(block)]
+            # Trees are stored stage by stage with one tree per output in each stage
+            summed[start:start + len(block)] = leaf_values.reshape(len(block), -1, self.n_outputs).sum(axis=1)
+        return summed
+
+    # Raw ensemble scores (log-odds for binary models), shape (rows, outputs)
+    def raw_predict(self, X):
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.init_raw + self.learning_rate * self._leaf_sum(X)
+
+    def predict_proba(self, X):
+        raw = self.raw_predict(X)
+        if self.n_outputs == 1:
+            positive = expit(raw[:, 0])
+            return np.column_stack([1 - positive, positive])
+        return softmax(raw, axis=1)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+if njit is not None:
+    # Branch-free heap walk over rows in parallel, used when numba is installed
+    @njit(parallel=True, cache=True)
+    def _numba_leaf_sum(X, feature, threshold, missing_left, value, depth, n_outputs):
+        n_trees, n_internal = feature.shape
+        summed = np.zeros((X.shape[0], n_outputs))
+        for i in prange(X.shape[0]):
+            for t in range(n_trees):
+                h = 0
+                for _ in range(depth):
+                    x = X[i, feature[t, h]]
+                    go_left = x <= threshold[t, h] or (x != x and missing_left[t, h])
+                    h = 2 * h + 2 - go_left
+                summed[i, t % n_outputs] += value[t, h]
+        return summed
+else:
+    _numba_leaf_sum = None
+
+
+# A fitted pipeline whose final gradient boosting step runs on the compiled evaluator.
+# Resampling steps (SMOTE) only apply during fit and are skipped, as in imblearn.
+class CompiledPipeline:
+    def __init__(self, pipeline=None, transformers=None, model=None, feature_names_in_=None):
+        if pipeline is not None:
+            transformers = [step for _, step in pipeline.steps[:-1] if not hasattr(step, 'fit_resample')]
+            model = CompiledGradientBoosting.from_estimator(pipeline.steps[-1][1])
+            feature_names_in_ = getattr(pipeline, 'feature_names_in_', None)
+        self.transformers = transformers
+        self.model = model
+        self.classes_ = self.model.classes_
+        self.feature_names_in_ = feature_names_in_
+
+    # Save as a folder: the tree arrays as .npy files, the preprocessing steps pickled on their own.
+    # The folder is written under a temporary name and renamed, so it is never seen half-written.
+    def save(self, folder, version=None):
+        tmp_folder = f'{folder}.{os.getpid()}.tmp'
+        old_folder = f'{folder}.{os.getpid()}.old'
+        os.makedirs(tmp_folder, exist_ok=True)
+        try:
+            self.model.save(tmp_folder)
+            joblib.dump({'transformers': self.transformers, 'feature_names_in_': self.feature_names_in_},
+                        os.path.join(tmp_folder, 'preprocessor.joblib'))
+            with open(os.path.join(tmp_folder, 'artifact.json'), 'w', encoding='utf-8') as file:
+                json.dump({'version': version, 'format': ARTIFACT_FORMAT}, file)
+            # An existing folder is renamed aside before the new one takes its name, so readers never find
+            # it half-deleted; processes still mapping the old files keep them until they unmap them
+            if os.path.exists(folder):
+                os.rename(folder, old_folder)
+            os.rename(tmp_folder, folder)
+        finally:
+            shutil.rmtree(tmp_folder, ignore_errors=True)
+            shutil.rmtree(old_folder, ignore_errors=True)
+
+    @classmethod
+    def load(cls, folder, mmap_mode='r'):
+        preprocessor = joblib.load(os.path.join(folder, 'preprocessor.joblib'))
+        return cls(transformers=preprocessor['transformers'], model=CompiledGradientBoosting.load(folder, mmap_mode),
+                   feature_names_in_=preprocessor['feature_names_in_'])
+
+    # Version of the model a saved folder was compiled from, None if there is no complete folder of this format
+    @staticmethod
+    def saved_version(folder):
+        try:
+            with open(os.path.join(folder, 'artifact.json'), encoding='utf-8') as file:
+                artifact = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return artifact.get('version') if artifact.get('format') == ARTIFACT_FORMAT else None
+
+    def transform(self, df):
+        X = df
+        for transformer in self.transformers:
+            X = transformer.transform(X)
+        return X.toarray() if hasattr(X, 'toarray') else np.asarray(X)
+
+    def predict_proba(self, df):
+        return self.model.predict_proba(self.transform(df))
+
+    def predict(self, df):
+        return self.classes_[self.predict_proba(df).argmax(axis=1)]
+
+
+# Largest absolute difference between sklearn's and the compiled probabilities
+def check_parity(pipeline, compiled, df):
+    return float(np.abs(pipeline.predict_proba(df) - compiled.predict_proba(df)).max())
+
+
+if __name__ == '__main__':
+    from utils.scoring import FEATURE_COLUMNS, NUMERIC_FEATURES
+
+    parser = argparse.ArgumentParser(description='Check the compiled evaluator against sklearn')
+    parser.add_argument('--model', default='./Models/best_gbc_tuned.joblib')
+    parser.add_argument('--data', nargs='+', default=['Data/churn_data.csv', 'Data/LP2_Telco-churn-second-2000.csv', 'Data/Telco-churn-last-2000.xlsx'])
+    parser.add_argument('--atol', type=float, default=1e-9)
+    args = parser.parse_args()
+
+    pipeline = joblib.load(args.model)
+    compiled = CompiledPipeline(pipeline)
+    engine = 'numba' if _numba_leaf_sum is not None else 'numpy'
+    print(f'Compiled {compiled.model.n_trees} trees into {compiled.model.nbytes / 1024:.1f} KiB of arrays ({engine} evaluator)')
+
+    failed = False
+    for path in args.data:
+        df = pd.read_excel(path) if path.endswith(('.xls', '.xlsx')) else pd.read_csv(path)
+        df = df.reindex(columns=FEATURE_COLUMNS)
+        for col in NUMERIC_FEATURES:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+        # Compare the model step alone, the preprocessing is shared by both
+        X = compiled.transform(df)
+        compiled.model.predict_proba(X[:1])  # Trigger numba compilation before timing
+        start = time.perf_counter()
+        pipeline.steps[-1][1].predict_proba(X)
+        sklearn_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        compiled.model.predict_proba(X)
+        compiled_seconds = time.perf_counter() - start
+
+        max_diff = check_parity(pipeline, compiled, df)
+        failed |= max_diff > args.atol
+        print(f'{path}: {len(df)} rows, max |diff| {max_diff:.2e}, sklearn {sklearn_seconds * 1000:.1f} ms, compiled {compiled_seconds * 1000:.1f} ms')
+
+    raise SystemExit(1 if failed else 0)
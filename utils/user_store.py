@@ -0,0 +1,167 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import streamlit as st
+import yaml
+from yaml.loader import SafeLoader
+
+# SQLite database holding the registered users
+USERS_DB_PATH = 'Data/users.db'
+
+# YAML file with the cookie settings, and the users before they moved to the database
+CONFIG_PATH = './config.yaml'
+
+# Credential fields stored in their own columns, anything else goes to the attributes JSON
+USER_FIELDS = ['name', 'email', 'password']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    password TEXT NOT NULL,
+    attributes TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', '0');
+"""
+
+INSERT_SQL = "INSERT INTO users (username, name, email, password, attributes) VALUES (?, ?, ?, ?, ?) ON CONFLICT (username) DO NOTHING"
+
+
+# Split a credentials entry into the users table columns
+def _to_row(username, record):
+    attributes = {key: value for key, value in record.items() if key not in USER_FIELDS}
+    return (username, record.get('name'), record.get('email'), record['password'], json.dumps(attributes, sort_keys=True))
+
+
+def _from_row(name, email, password, attributes):
+    record = {'email': email, 'name': name, 'password': password}
+    record.update(json.loads(attributes))
+    return record
+
+
+# Registered users kept in SQLite, so sign-ups only write their own row instead of rewriting config.yaml
+class UserStore:
+    def __init__(self, db_path=USERS_DB_PATH):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+        # In-memory username index, reloaded whenever the version in the database moves
+        self._index = None
+        self._index_version = None
+
+    # Bumped by every write, from this process or any other
+    def version(self):
+        with self._lock:
+            return int(self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0])
+
+    def _refresh(self):
+        version = self.version()
+        if self._index is None or version != self._index_version:
+            with self._lock:
+                rows = self._conn.execute('SELECT username, name, email, password, attributes FROM users').fetchall()
+            self._index = {username: _from_row(*row) for username, *row in rows}
+            self._index_version = version
+        return self._index
+
+    def usernames(self):
+        return set(self._refresh())
+
+    def exists(self, username):
+        return username.lower() in self._refresh()
+
+    # Credentials in the layout expected by stauth.Authenticate, copied so the authenticator can modify them
+    def credentials(self):
+        return {'usernames': copy.deepcopy(self._refresh())}
+
+    # Run a write in one locked transaction and bump the version so every index is invalidated
+    def _write(self, statements):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                results = [self._conn.execute(sql, params).rowcount for sql, params in statements]
+                if any(results):
+                    self._conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        self._index = None
+        return results
+
+    # Persist the users registered into a credentials dict, returns the usernames that were already taken
+    def save_credentials(self, credentials):
+        index = self._refresh()
+        added, taken = [], []
+        for username, record in credentials['usernames'].items():
+            if username not in index:
+                added.append(username)
+            # Salted hashes never match, so a different password means another session registered the name first
+            elif record['password'] != index[username]['password']:
+                taken.append(username)
+        if not added:
+            return taken
+
+        results = self._write([(INSERT_SQL, _to_row(username, credentials['usernames'][username])) for username in added])
+        # A concurrent sign-up in another process can still win between the index check and the insert
+        return taken + [username for username, inserted in zip(added, results) if not inserted]
+
+    # One-time import of the users from config.yaml
+    def import_yaml(self, config_path=CONFIG_PATH):
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM meta WHERE key = 'yaml_imported'").fetchone():
+                return 0
+        config = load_config(config_path)
+        users = (config.get('credentials') or {}).get('usernames') or {}
+        statements = [(INSERT_SQL, _to_row(username.lower(), record)) for username, record in users.items()]
+        statements.append(("INSERT OR IGNORE INTO meta (key, value) VALUES ('yaml_imported', '1')", ()))
+        results = self._write(statements)
+        return sum(results[:-1])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def load_config(config_path=CONFIG_PATH):
+    with open(config_path, 'r', encoding='utf-8') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+# One store per process, migrated from config.yaml on first use
+@st.cache_resource(show_spinner=False)
+def get_user_store(db_path=USERS_DB_PATH, config_path=CONFIG_PATH):
+    store = UserStore(db_path)
+    if os.path.exists(config_path):
+        store.import_yaml(config_path)
+    return store
+
+
+# Credentials are loaded once per process and store version, a sign-up anywhere triggers a reload
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_credentials(version):
+    return get_user_store().credentials()
+
+
+# streamlit_authenticator is imported on the first login form a process renders, not when a page loads
+@st.cache_resource(show_spinner=False)
+def get_auth_module():
+    import streamlit_authenticator as stauth
+    return stauth
+
+
+# Authenticator for the current session, with the credentials dict it registers new users into.
+# It is built on every run: it reads the browser's cookies and seeds the session state, so it cannot be shared.
+def get_authenticator(config):
+    stauth = get_auth_module()
+    credentials = copy.deepcopy(_load_credentials(get_user_store().version()))
+    preauthorized = list((config.get('preauthorized') or {}).get('usernames') or [])
+    cookie = config['cookie']
+    authenticator = stauth.Authenticate(credentials, cookie['name'], cookie['key'], cookie['expiry_days'], {'usernames': preauthorized})
+    return authenticator, credentials